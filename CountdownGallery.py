@@ -1,13 +1,199 @@
-import sys
+import time
 
-from PyQt5 import QtWidgets
+_started = time.perf_counter()
 
-from countdownapp import GalleryCountdownWindow
+import argparse  # noqa: E402
+import logging  # noqa: E402
+import sys  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from PyQt5 import QtCore, QtWidgets  # noqa: E402
+
+_qt_imported = time.perf_counter()
+
+from countdownapp import GalleryCountdownWindow, memory, metrics, session  # noqa: E402
+from countdownapp.schedule import load_schedule  # noqa: E402
+
+_app_imported = time.perf_counter()
+
+
+def parse_output(text: str):
+    parts = text.split(":")
+    screen = int(parts[0])
+    corner = int(parts[1]) if len(parts) > 1 and parts[1] else None
+    paddings = None
+    if len(parts) > 2:
+        paddings = [int(p) for p in parts[2].split(",")]
+        if len(paddings) != 4:
+            raise argparse.ArgumentTypeError("four paddings are needed")
+    return screen, corner, paddings
+
+
+def parse_group(text: str):
+    # left out parts are the defaults of countdownapp.sync
+    group, _, port = text.partition(":")
+    return group or None, int(port) if port else None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve performance metrics as JSON on http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        type=float,
+        metavar="SECONDS",
+        help="log a line with performance metrics every SECONDS",
+    )
+    parser.add_argument(
+        "--disk-cache-mb",
+        type=int,
+        help="size limit of the cache of scaled images on disk, 0 turns it off",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        help="limit for the images kept in memory (originals, scaled, prefetched)",
+    )
+    parser.add_argument(
+        "--output",
+        action="append",
+        default=[],
+        type=parse_output,
+        metavar="SCREEN[:CORNER[:TOP,RIGHT,BOTTOM,LEFT]]",
+        help="show the gallery also on screen number SCREEN, with its own timer"
+        " corner and slide paddings; may be repeated",
+    )
+    parser.add_argument(
+        "--session",
+        type=Path,
+        default=session.default_path(),
+        metavar="FILE",
+        help="where the session is saved every few seconds, default %(default)s",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue the saved session without scanning the folder again",
+    )
+    parser.add_argument(
+        "--schedule",
+        type=Path,
+        metavar="FILE",
+        help="run the segments of a JSON program one after the other",
+    )
+    sync = parser.add_mutually_exclusive_group()
+    sync.add_argument(
+        "--sync-lead",
+        action="store_true",
+        help="announce countdown and slides to --sync-follow instances in the LAN",
+    )
+    sync.add_argument(
+        "--sync-follow",
+        action="store_true",
+        help="run countdown and slides in lockstep with a --sync-lead instance",
+    )
+    parser.add_argument(
+        "--sync-group",
+        type=parse_group,
+        default=(None, None),
+        metavar="ADDRESS[:PORT]",
+        help="multicast group for syncing, default 239.255.42.99:45454",
+    )
+    parser.add_argument(
+        "--startup-profile",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="write how long the start took, per phase, to FILE or stdout",
+    )
+    # everything else is left to Qt
+    return parser.parse_known_args()
+
+
+def write_startup_profile(target: str, phases):
+    lines = [f"{name:32s} {1000 * seconds:8.1f} ms" for name, seconds in phases]
+    if target == "-":
+        print("\n".join(lines), flush=True)
+    else:
+        with open(target, "w") as f:
+            f.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
-    app = QtWidgets.QApplication(sys.argv)
+    args, qt_args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+    if args.metrics_log:
+        metrics.log_periodically(args.metrics_log)
+    if args.startup_profile:
+        metrics.enable()
+    if args.memory_mb is not None:
+        memory.governor().set_budget(args.memory_mb * 1024 * 1024)
+
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
+    app_created = time.perf_counter()
+
+    clock = None
+    if args.sync_follow:
+        from countdownapp.sync import SyncedClock
 
-    ui = GalleryCountdownWindow()
+        clock = SyncedClock()
+    ui = GalleryCountdownWindow(clock)
+    if args.sync_lead:
+        ui.startSyncLeader(*args.sync_group)
+    elif args.sync_follow:
+        ui.startSyncFollower(*args.sync_group)
+    if args.disk_cache_mb is not None:
+        ui.setDiskCacheBudget(args.disk_cache_mb * 1024 * 1024)
     ui.show()
+    screens = app.screens()
+    for index, corner, paddings in args.output:
+        if not 0 <= index < len(screens):
+            logging.warning("there is no screen %d, %d found", index, len(screens))
+            continue
+        output = ui.addOutput(screens[index])
+        if corner is not None:
+            output.setTimerCorner(corner)
+        if paddings is not None:
+            output.setSlideShowPaddings(paddings)
+    if args.resume:
+        state = session.load(args.session)
+        if state is None:
+            logging.warning("there is no session to resume in %s", args.session)
+        else:
+            ui.restoreSession(state)
+    ui.startAutosave(args.session)
+    if args.schedule:
+        try:
+            ui.runSchedule(load_schedule(args.schedule))
+        except (OSError, ValueError) as e:
+            sys.exit(f"cannot run the schedule {args.schedule}: {e}")
+    window_created = time.perf_counter()
+
+    if args.startup_profile:
+
+        def on_event_loop_running():
+            series = metrics.snapshot()["series"]
+            phases = [
+                ("import PyQt5", _qt_imported - _started),
+                ("import countdownapp", _app_imported - _qt_imported),
+                ("QApplication", app_created - _app_imported),
+                ("windows", window_created - app_created),
+            ]
+            for name, summary in series.items():
+                if name.startswith("startup."):
+                    phases.append(("  " + name[8:], summary["last"] / 1000))
+            phases.append(("first events", time.perf_counter() - window_created))
+            phases.append(("total", time.perf_counter() - _started))
+            write_startup_profile(args.startup_profile, phases)
+
+        QtCore.QTimer.singleShot(0, on_event_loop_running)
+
     sys.exit(app.exec_())
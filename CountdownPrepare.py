@@ -0,0 +1,72 @@
+"""Prepare a folder of images for the slideshow.
+
+Writes display sized, upright copies of all images into a hidden folder
+inside it, which the slideshow then uses instead of the originals. Running
+it again only processes new and changed files.
+
+    python CountdownPrepare.py photos --size 1920x1080
+"""
+import argparse
+import multiprocessing
+import sys
+from pathlib import Path
+
+from countdownapp.prepare import DEFAULT_QUALITY, DEFAULT_SIZE, prepare_folder
+
+
+def parse_size(text: str):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def print_progress(stats):
+    seconds = max(stats["seconds"], 1e-6)
+    print(
+        f"\r{stats['done']}/{stats['files']} files"
+        f" ({stats['prepared']} prepared, {stats['unchanged']} unchanged,"
+        f" {stats['failed']} failed)"
+        f" {stats['done'] / seconds:.1f} files/s"
+        f" {stats['bytes_read'] / seconds / 2**20:.1f} MB/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument("folder", type=Path)
+    parser.add_argument(
+        "--size",
+        type=parse_size,
+        default=DEFAULT_SIZE,
+        help="display resolution, default %dx%d" % DEFAULT_SIZE,
+    )
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY)
+    parser.add_argument("--workers", type=int, help="worker processes")
+    args = parser.parse_args()
+
+    stats = prepare_folder(
+        args.folder,
+        args.size,
+        args.recursive,
+        args.quality,
+        args.workers,
+        print_progress,
+    )
+    print_progress(stats)
+    print(f" in {stats['seconds']:.1f} s", file=sys.stderr)
+    for key, error in stats["errors"]:
+        print(f"{key}: {error}", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    # needed for the worker processes of a frozen build
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Render a countdown show offline, faster than real time.
+
+    python CountdownRender.py photos --countdown 300 --output frames/%06d.png
+    python CountdownRender.py photos --countdown 300 --raw | ffmpeg -f rawvideo \
+        -pix_fmt rgb24 -s 1920x1080 -r 30 -i - show.mp4
+"""
+import argparse
+import datetime
+import math
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+
+from countdownapp.clock import SimulatedClock  # noqa: E402
+from countdownapp.render import (  # noqa: E402
+    ImageSequenceWriter,
+    OfflineRenderer,
+    RawFrameWriter,
+)
+
+
+def parse_size(text: str) -> QtCore.QSize:
+    width, height = text.lower().split("x")
+    return QtCore.QSize(int(width), int(height))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument("folder", type=Path, help="folder with the slideshow images")
+    parser.add_argument(
+        "--countdown", type=float, required=True, help="length of the countdown [s]"
+    )
+    parser.add_argument(
+        "--duration", type=float, help="length of the output [s], default: countdown"
+    )
+    parser.add_argument("--size", type=parse_size, default=QtCore.QSize(1920, 1080))
+    parser.add_argument("--fps", type=float, default=30.0)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", help="file name pattern like frames/%%06d.png")
+    output.add_argument(
+        "--raw", action="store_true", help="write rgb24 frames to stdout"
+    )
+    parser.add_argument("--quality", type=int, default=-1, help="JPEG/WebP quality")
+    parser.add_argument("--workers", type=int, help="encoder threads")
+    parser.add_argument("--pause", type=float, default=5.0, help="seconds per image")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--shuffle", type=int, metavar="SEED")
+    parser.add_argument("--background", type=Path, help="background picture")
+    parser.add_argument(
+        "--paddings",
+        default="0 0 0 0",
+        help="slide paddings in percent: top right bottom left",
+    )
+    parser.add_argument("--corner", type=int, default=3, help="timer corner 1...9")
+    parser.add_argument("--font", default="Arial")
+    parser.add_argument("--font-size", type=int, default=200)
+    parser.add_argument("--color", default="white")
+    parser.add_argument("--padding-x", type=int, default=20)
+    parser.add_argument("--padding-y", type=int, default=20)
+    parser.add_argument("--no-timer", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    app = QtWidgets.QApplication(sys.argv[:1])  # noqa: F841
+
+    clock = SimulatedClock()
+    renderer = OfflineRenderer(args.size, args.fps, clock)
+    slideshow = renderer.slideshow()
+    slideshow.set_pause(args.pause)
+    slideshow._view.setSlideShowPaddings([int(p) for p in args.paddings.split()])
+    if args.background:
+        slideshow.set_background_picture(args.background)
+    if args.shuffle is not None:
+        slideshow.set_shuffle(args.shuffle)
+    timer = renderer.timer()
+    timer.setFont(QtGui.QFont(args.font, args.font_size))
+    timer.setFontColor(QtGui.QColor(args.color))
+    timer.setPaddingX(args.padding_x)
+    timer.setPaddingY(args.padding_y)
+    renderer.setTimerCorner(args.corner)
+    renderer.setTimerVisible(not args.no_timer)
+
+    end_time = clock.now() + datetime.timedelta(seconds=args.countdown)
+    renderer.start(args.folder, end_time, args.recursive)
+    duration = args.countdown if args.duration is None else args.duration
+    count = math.ceil(duration * args.fps)
+    if args.raw:
+        writer = RawFrameWriter(sys.stdout.buffer)
+    else:
+        writer = ImageSequenceWriter(args.output, args.quality)
+    stats = renderer.render(count, writer, args.workers)
+    print(
+        f"{stats['frames']} frames ({stats['encoded']} distinct) in "
+        f"{stats['seconds']:.1f} s, {stats['realtime_factor']:.1f}x real time",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Offscreen benchmarks for the slideshow and timer hot paths.
+
+Runs without a display on Qt's offscreen platform and prints the results as
+JSON. Pass ``--compare`` with the output of an earlier run to see relative
+changes; the exit code is 1 if any timing got slower than ``--threshold``.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from PyQt5 import QtCore, QtGui, QtWidgets  # noqa: E402
+
+from countdownapp.clock import SystemClock  # noqa: E402
+from countdownapp.gallery import PixmapView, Slideshow  # noqa: E402
+from countdownapp.sync import SyncedClock, SyncFollower, SyncLeader  # noqa: E402
+from countdownapp.timer import CountdownTimer  # noqa: E402
+
+RESOLUTIONS = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+# (megapixel label, width, height) of the generated camera images
+IMAGE_SIZES = [("6mp", 3000, 2000), ("24mp", 6000, 4000)]
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def summarize(samples_s):
+    samples_ms = sorted(1000 * s for s in samples_s)
+    return {
+        "n": len(samples_ms),
+        "min_ms": samples_ms[0],
+        "median_ms": statistics.median(samples_ms),
+        "max_ms": samples_ms[-1],
+    }
+
+
+def wait_until(app, predicate, timeout_s=60.0):
+    deadline = time.perf_counter() + timeout_s
+    while not predicate():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("benchmark step timed out")
+        app.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 10)
+
+
+def make_image(width, height, seed):
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    gradient = QtGui.QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0, QtGui.QColor.fromHsv(seed * 37 % 360, 200, 220))
+    gradient.setColorAt(1, QtGui.QColor.fromHsv(seed * 91 % 360, 120, 60))
+    painter = QtGui.QPainter(image)
+    painter.fillRect(image.rect(), gradient)
+    painter.setPen(QtGui.QPen(QtGui.QColor("white"), max(1, width // 500)))
+    # some detail so the JPEG encoder has real work to do
+    for i in range(0, width, max(1, width // 60)):
+        painter.drawLine(i, 0, width - i, height)
+    painter.end()
+    return image
+
+
+def make_folder(root, name, count, width, height):
+    folder = Path(root) / name
+    folder.mkdir()
+    template = folder / "template.jpg"
+    make_image(width, height, count).save(str(template), "JPG", 90)
+    for i in range(count):
+        shutil.copyfile(template, folder / f"img_{i:06d}.jpg")
+    template.unlink()
+    return folder
+
+
+def bench_scan(app, root, counts):
+    results = {}
+    host = QtWidgets.QWidget()
+    host.resize(1280, 720)
+    for count in counts:
+        folder = make_folder(root, f"scan_{count}", count, 320, 240)
+        slideshow = Slideshow(host)
+        slideshow.resize(host.size())
+        slideshow.set_pause(3600)
+        first_image = []
+        done = []
+        slideshow._scanner.batchFound.connect(
+            lambda *_: first_image or first_image.append(time.perf_counter())
+        )
+        slideshow._scanner.finished.connect(lambda *_: done.append(1))
+        start = time.perf_counter()
+        slideshow.start(folder)
+        wait_until(app, lambda: done)
+        app.processEvents()
+        end = time.perf_counter()
+        results[str(count)] = {
+            "first_image_ms": 1000 * (first_image[0] - start),
+            "complete_ms": 1000 * (end - start),
+            "playlist_len": len(slideshow.playlist()),
+        }
+        slideshow.stop()
+        slideshow.deleteLater()
+    return results
+
+
+def bench_decode(app, root, per_size):
+    results = {}
+    host = QtWidgets.QWidget()
+    host.resize(1920, 1080)
+    # shown (offscreen), so the views get their size and slides are decoded
+    # for the full screen instead of the default widget size
+    host.show()
+    for label, width, height in IMAGE_SIZES:
+        folder = make_folder(root, f"decode_{label}", per_size, width, height)
+        for lookahead in (0, 2):
+            slideshow = Slideshow(host)
+            slideshow.resize(host.size())
+            slideshow.show()
+            app.processEvents()
+            size = slideshow.slide_size()
+            assert size.width() >= 1280, f"slides are decoded for {size}"
+            slideshow.set_pause(3600)
+            slideshow.set_lookahead(lookahead)
+            slideshow.start(folder)
+            wait_until(app, lambda: slideshow._image_file is not None)
+            samples = []
+            for _ in range(per_size):
+                if lookahead:
+                    # let the workers finish, we measure the GUI thread cost
+                    wait_until(app, lambda: not slideshow._prefetcher._pending)
+                start = time.perf_counter()
+                slideshow.show_next_image()
+                samples.append(time.perf_counter() - start)
+            results[f"{label}_lookahead{lookahead}"] = summarize(samples)
+            slideshow.stop()
+            slideshow.deleteLater()
+    host.close()
+    return results
+
+
+def bench_scale(app, repeats):
+    results = {}
+    source = QtGui.QPixmap.fromImage(make_image(6000, 4000, 1))
+    host = QtWidgets.QWidget()
+    view = PixmapView(host)
+    view.setSlideShowPaddings([10, 40, 20, 3])
+    view._bg_pic = source
+    view.set_next(source, "bench")
+    for name, (width, height) in RESOLUTIONS.items():
+        cold = []
+        warm = []
+        for _ in range(repeats):
+            view._scaled_cache.clear()
+            view.resize(width, height)
+            start = time.perf_counter()
+            view.resizeEvent()
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            view.resizeEvent()
+            warm.append(time.perf_counter() - start)
+        results[name] = {"cold": summarize(cold), "warm": summarize(warm)}
+    return results
+
+
+def bench_timer(app, seconds):
+    host = QtWidgets.QWidget()
+    timer = CountdownTimer(host)
+    host.show()
+    timer.start(datetime.datetime.now() + datetime.timedelta(seconds=3600))
+    end = time.perf_counter() + seconds
+    wait_until(app, lambda: time.perf_counter() > end, seconds + 5)
+    stats = timer.jitter_stats()
+    timer.cancel()
+    return stats
+
+
+class ShiftedClock(SystemClock):
+    # a machine whose monotonic clock started at another time
+    def __init__(self, shift):
+        self._shift = shift
+
+    def monotonic(self):
+        return super().monotonic() + self._shift
+
+
+def bench_sync(app, followers, seconds, port=45455):
+    # leader and followers in one process, talking over multicast loopback
+    host = QtWidgets.QWidget()
+    leader_timer = CountdownTimer(host)
+    leader = SyncLeader(leader_timer, Slideshow(host), port=port)
+    shifts = [1000.0 * (i + 1) for i in range(followers)]
+    clocks, timers, nodes = [], [], []
+    for shift in shifts:
+        clock = SyncedClock(ShiftedClock(shift))
+        timer = CountdownTimer(host, clock)
+        node = SyncFollower(clock, port=port)
+        node.endTimeChanged.connect(timer.start)
+        clocks.append(clock)
+        timers.append(timer)
+        nodes.append(node)
+    leader_timer.start(datetime.datetime.now() + datetime.timedelta(seconds=3600))
+    end = time.perf_counter() + seconds
+    wait_until(app, lambda: time.perf_counter() > end, seconds + 5)
+    # a follower's synced clock shows the leader's monotonic time
+    offset_errors = [abs(c.offset() + shift) for c, shift in zip(clocks, shifts)]
+    deadline_errors = [
+        abs(t.deadline() - leader_timer.deadline()) if t.deadline() else float("inf")
+        for t in timers
+    ]
+    stats = {
+        "followers": followers,
+        "synced": sum(n.is_synced() for n in nodes),
+        "beacons": leader.beacons,
+        "offset_error": summarize(offset_errors),
+        "deadline_error": summarize(deadline_errors),
+    }
+    leader.stop()
+    for node in nodes:
+        node.stop()
+    leader_timer.cancel()
+    for timer in timers:
+        timer.cancel()
+    return stats
+
+
+def compare(current, baseline, threshold):
+    regressions = []
+
+    def walk(cur, base, path):
+        for key, value in cur.items():
+            if key not in base:
+                continue
+            if isinstance(value, dict):
+                walk(value, base[key], path + [key])
+            elif key.endswith("_ms") and base[key] > 0:
+                change = (value - base[key]) / base[key]
+                name = ".".join(path + [key])
+                print(f"{name:60s} {base[key]:10.2f} -> {value:10.2f} ms {change:+.0%}")
+                if change > threshold:
+                    regressions.append(name)
+
+    walk(current["results"], baseline["results"], [])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write the JSON results here")
+    parser.add_argument("--compare", type=Path, help="JSON results of a former run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--scan-counts", default="100,1000,5000")
+    parser.add_argument("--decode-images", type=int, default=5)
+    parser.add_argument("--scale-repeats", type=int, default=3)
+    parser.add_argument("--timer-seconds", type=float, default=5.0)
+    parser.add_argument("--sync-followers", type=int, default=8)
+    parser.add_argument("--sync-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    with tempfile.TemporaryDirectory(prefix="countdown-bench-") as root:
+        counts = [int(c) for c in args.scan_counts.split(",") if c]
+        results = {
+            "scan": bench_scan(app, root, counts),
+            "decode": bench_decode(app, root, args.decode_images),
+            "scale": bench_scale(app, args.scale_repeats),
+            "timer_jitter": bench_timer(app, args.timer_seconds),
+            "sync": bench_sync(app, args.sync_followers, args.sync_seconds),
+        }
+    results["peak_rss_kb"] = peak_rss_kb()
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "qt": QtCore.QT_VERSION_STR,
+            "pyqt": QtCore.PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} timings regressed by more than "
+                f"{args.threshold:.0%}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Soak test: plays a long show on a simulated clock and looks for leaks.
+
+The gallery window runs offscreen on a SimulatedClock through programs of
+countdown segments, each followed by a countdown entered in the config
+window, with folder switches, restarts of the slideshow, end time edits,
+resizes and, where QtMultimedia works, music and end videos.
+Threads, RSS, open file handles, Qt objects and the countdown's tick error
+are sampled over simulated time. The exit code is 1 if any of them grows
+over the run (after a warm-up) by more than its limit.
+
+    python benchmarks/soak.py --hours 12
+    python benchmarks/soak.py --hours 2 --music song.mp3 --video end.mp4
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from PyQt5 import QtCore, QtWidgets  # noqa: E402
+
+from countdownapp import GalleryCountdownWindow, memory  # noqa: E402
+from countdownapp.clock import SimulatedClock  # noqa: E402
+from countdownapp.schedule import Segment  # noqa: E402
+from run_benchmarks import make_folder, peak_rss_kb  # noqa: E402
+
+# growth over the measured part of the run that counts as a leak
+LIMITS = {
+    "threads": 1,
+    "rss_kb": 64 * 1024,
+    "handles": 4,
+    "qobjects": 50,
+    "widgets": 2,
+}
+# largest difference of the countdown to the remaining time [s]
+TICK_ERROR_LIMIT_S = 1
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        # the peak is all there is elsewhere, it still shows growth
+        return peak_rss_kb()
+
+
+def open_handles():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def multimedia_available():
+    try:
+        from PyQt5 import QtMultimedia  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def tick_error(window, clock):
+    # seconds between what the countdown shows and what it should show; the
+    # display steps down as soon as a second boundary is reached
+    timer = window._timerWidget
+    deadline = timer.deadline()
+    if deadline is None or timer._shown is None:
+        return 0
+    return timer._shown - (math.ceil(deadline - clock.monotonic()) - 1)
+
+
+def sample(app, window, clock):
+    return {
+        "t_h": clock.monotonic() / 3600,
+        "threads": threading.active_count(),
+        "rss_kb": rss_kb(),
+        "handles": open_handles(),
+        "qobjects": len(window.findChildren(QtCore.QObject)),
+        "widgets": len(app.allWidgets()),
+        "memory_bytes": memory.governor().stats()["bytes"],
+        "tick_error_s": tick_error(window, clock),
+    }
+
+
+def slope(points):
+    # least squares slope of (x, y)
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def trends(samples, warmup):
+    # thread pools and caches fill up first, only the rest has to be flat
+    start = samples[0]["t_h"] + warmup * (samples[-1]["t_h"] - samples[0]["t_h"])
+    measured = [s for s in samples if s["t_h"] >= start]
+    span = measured[-1]["t_h"] - measured[0]["t_h"]
+    results = {}
+    for name, limit in LIMITS.items():
+        points = [(s["t_h"], s[name]) for s in measured if s[name] is not None]
+        if len(points) < 3:
+            continue
+        per_hour = slope(points)
+        growth = per_hour * span
+        results[name] = {
+            "first": points[0][1],
+            "last": points[-1][1],
+            "per_hour": per_hour,
+            "growth": growth,
+            "limit": limit,
+            "ok": growth <= limit,
+        }
+    errors = [abs(s["tick_error_s"]) for s in samples]
+    results["tick_error_s"] = {
+        "max": max(errors),
+        "limit": TICK_ERROR_LIMIT_S,
+        "ok": max(errors) <= TICK_ERROR_LIMIT_S,
+    }
+    return results
+
+
+def make_program(folders, count, segment_minutes, music, video):
+    segments = []
+    for i in range(count):
+        segments.append(
+            Segment(
+                name=f"segment {i}",
+                duration_s=segment_minutes * 60,
+                folder=folders[i % len(folders)],
+                music=music,
+                video=video if i % 2 else None,
+                auto_quit=False,
+            )
+        )
+    return segments
+
+
+def enter_end_time(config, end_time):
+    # typed into the config window like the operator would
+    config._end_time_input.setText(end_time.strftime("%H:%M:%S"))
+    config.on_end_time_changed()
+
+
+def run(app, args):
+    clock = SimulatedClock()
+    with tempfile.TemporaryDirectory(prefix="countdown-soak-") as root:
+        # the window's disk cache and session stay out of the user's home
+        os.environ["XDG_CACHE_HOME"] = str(Path(root) / "cache")
+        folders = [
+            make_folder(root, name, args.images, 1920, 1280) for name in ("a", "b", "c")
+        ]
+        media = multimedia_available()
+        music = args.music if media else None
+        video = args.video if media else None
+
+        window = GalleryCountdownWindow(clock)
+        window.resize(1280, 720)
+        window.show()
+        config = window._config_window
+        config._auto_quit_cb.setChecked(False)
+        config._pause_input.setText(str(args.pause))
+        config.on_pause_changed()
+        program = make_program(
+            folders, args.segments, args.segment_minutes, music, video
+        )
+        window.runSchedule(program)
+        free = False
+
+        end = args.hours * 3600
+        next_sample = 0.0
+        next_restart = args.restart_minutes * 60
+        next_edit = args.edit_minutes * 60
+        next_resize = args.resize_minutes * 60
+        sizes = [(1280, 720), (1920, 1080), (1024, 768)]
+        samples = []
+        started = time.perf_counter()
+        while clock.monotonic() < end:
+            clock.advance(args.step)
+            app.processEvents()
+            now = clock.monotonic()
+            # sampled before the changes below, whose events are still pending
+            if now >= next_sample:
+                next_sample += args.sample_minutes * 60
+                samples.append(sample(app, window, clock))
+                if args.verbose:
+                    print(json.dumps(samples[-1]), flush=True)
+            if now >= next_restart:
+                next_restart += args.restart_minutes * 60
+                window._slidesWidget.start(
+                    Path(config._dir_label.text()), config._cb_recursive.isChecked()
+                )
+            if now >= next_edit:
+                next_edit += args.edit_minutes * 60
+                # a late change of the end time; a program segment keeps its own
+                enter_end_time(
+                    config,
+                    clock.now() + datetime.timedelta(minutes=args.free_minutes / 2),
+                )
+            if now >= next_resize:
+                next_resize += args.resize_minutes * 60
+                sizes.append(sizes.pop(0))
+                window.resize(*sizes[0])
+            if not free and not window._schedule_running():
+                # the program is over, a countdown of its own follows
+                free = True
+                window._slidesWidget.start(
+                    Path(config._dir_label.text()), config._cb_recursive.isChecked()
+                )
+                enter_end_time(
+                    config, clock.now() + datetime.timedelta(minutes=args.free_minutes)
+                )
+            elif free and window._timerWidget.deadline() is None:
+                free = False
+                window.runSchedule(program)
+        samples.append(sample(app, window, clock))
+        window.close()
+        # deleted while the app still exists; the garbage collector would
+        # get to them at some point during the shutdown otherwise
+        config.deleteLater()
+        window.deleteLater()
+        app.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+    results = trends(samples, args.warmup)
+    return {
+        "meta": {
+            "simulated_hours": args.hours,
+            "wall_s": time.perf_counter() - started,
+            "multimedia": media,
+            "music": str(music) if music else None,
+            "video": str(video) if video else None,
+        },
+        "trends": results,
+        "samples": samples,
+        "ok": all(r["ok"] for r in results.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[1:]),
+    )
+    parser.add_argument("--hours", type=float, default=12.0, help="simulated time")
+    parser.add_argument(
+        "--step", type=float, default=0.5, help="simulated seconds per loop [s]"
+    )
+    parser.add_argument("--pause", type=int, default=10, help="slide pause [s]")
+    parser.add_argument("--images", type=int, default=20, help="images per folder")
+    parser.add_argument("--segments", type=int, default=3, help="per program")
+    parser.add_argument("--segment-minutes", type=float, default=30.0)
+    parser.add_argument(
+        "--free-minutes", type=float, default=30.0, help="countdown after a program"
+    )
+    parser.add_argument("--restart-minutes", type=float, default=47.0)
+    parser.add_argument("--edit-minutes", type=float, default=19.0)
+    parser.add_argument("--resize-minutes", type=float, default=13.0)
+    parser.add_argument("--sample-minutes", type=float, default=10.0)
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=0.25,
+        help="share of the run left out of the trends",
+    )
+    parser.add_argument("--music", type=Path, help="music played in every segment")
+    parser.add_argument("--video", type=Path, help="end video of every other segment")
+    parser.add_argument("--output", type=Path, help="write the JSON results here")
+    parser.add_argument("--verbose", action="store_true", help="print every sample")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv[:1])
+    report = run(app, args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    for name, result in report["trends"].items():
+        status = "ok" if result["ok"] else "GROWING"
+        detail = {k: v for k, v in result.items() if k != "ok"}
+        print(f"{name:14s} {status:8s} {detail}")
+    if not report["ok"]:
+        print("soak test failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
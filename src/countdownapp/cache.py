@@ -0,0 +1,168 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from PyQt5 import QtCore, QtGui
+
+from . import metrics
+from .memory import MemoryGovernor, governor
+
+DEFAULT_BUDGET_BYTES = 128 * 1024 * 1024
+
+
+def pixmap_bytes(pixmap: QtGui.QPixmap) -> int:
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class ScaledPixmapCache:
+    """LRU cache of scaled pixmaps bounded by the bytes of the cached pixels.
+
+    Entries are keyed by a source identity (a file name or the cacheKey() of
+    the original pixmap) and its size, the target size and the transformation
+    mode. Entries are also accounted with the memory governor, which may
+    take back all but the pinned ones.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int = DEFAULT_BUDGET_BYTES,
+        memory: Optional[MemoryGovernor] = None,
+    ):
+        self._budget = budget_bytes
+        self._memory = memory if memory is not None else governor()
+        self._entries: "OrderedDict[Tuple, QtGui.QPixmap]" = OrderedDict()
+        # pinned copies per holder, views sharing the cache pin their own
+        self._pinned: Dict[Hashable, Set[Tuple]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def budget(self) -> int:
+        return self._budget
+
+    def set_budget(self, budget_bytes: int):
+        self._budget = max(0, budget_bytes)
+        self._evict()
+
+    def pin(
+        self,
+        copies: Iterable[Tuple[Hashable, QtCore.QSize]],
+        holder: Hashable = None,
+    ):
+        """Keeps the copies of (source, target size), e.g. the ones on screen,
+        from the memory governor. Replaces what holder pinned before."""
+        self._pinned[holder] = {
+            (source, size.width(), size.height()) for source, size in copies
+        }
+
+    def unpin(self, holder: Hashable = None):
+        self._pinned.pop(holder, None)
+
+    def scaled(
+        self,
+        source: Hashable,
+        pixmap: QtGui.QPixmap,
+        size: QtCore.QSize,
+        mode: QtCore.Qt.TransformationMode = (
+            QtCore.Qt.TransformationMode.SmoothTransformation
+        ),
+    ) -> QtGui.QPixmap:
+        key = (
+            source,
+            pixmap.width(),
+            pixmap.height(),
+            size.width(),
+            size.height(),
+            int(mode),
+        )
+        scaled = self._entries.get(key)
+        if scaled is not None:
+            self._entries.move_to_end(key)
+            self._memory.touch(self, key)
+            self.hits += 1
+            return scaled
+        self.misses += 1
+        with metrics.timed("scale_ms"):
+            scaled = pixmap.scaled(
+                size, QtCore.Qt.AspectRatioMode.KeepAspectRatio, mode
+            )
+        self._add(key, scaled)
+        return scaled
+
+    def lookup(
+        self,
+        source: Hashable,
+        size: QtCore.QSize,
+        mode: QtCore.Qt.TransformationMode = (
+            QtCore.Qt.TransformationMode.SmoothTransformation
+        ),
+    ) -> Optional[QtGui.QPixmap]:
+        # entries added with insert(), which were scaled elsewhere
+        key = (source, None, None, size.width(), size.height(), int(mode))
+        scaled = self._entries.get(key)
+        if scaled is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._memory.touch(self, key)
+        self.hits += 1
+        return scaled
+
+    def insert(
+        self,
+        source: Hashable,
+        size: QtCore.QSize,
+        scaled: QtGui.QPixmap,
+        mode: QtCore.Qt.TransformationMode = (
+            QtCore.Qt.TransformationMode.SmoothTransformation
+        ),
+    ):
+        key = (source, None, None, size.width(), size.height(), int(mode))
+        self._add(key, scaled)
+
+    def _add(self, key: Tuple, scaled: QtGui.QPixmap):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= pixmap_bytes(old)
+        self._entries[key] = scaled
+        self._bytes += pixmap_bytes(scaled)
+        self._evict()
+        if key in self._entries:
+            self._memory.track(self, key, pixmap_bytes(scaled), "scaled")
+
+    def release_memory(self, key: Tuple) -> bool:
+        copy = (key[0], key[3], key[4])
+        if key not in self._entries or any(copy in p for p in self._pinned.values()):
+            return False
+        self._bytes -= pixmap_bytes(self._entries.pop(key))
+        self.evictions += 1
+        return True
+
+    def discard(self, source: Hashable):
+        """Drops all copies of source, e.g. after it was decoded again."""
+        for key in [k for k in self._entries if k[0] == source]:
+            self._bytes -= pixmap_bytes(self._entries.pop(key))
+            self._memory.untrack(self, key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._memory.untrack_all(self)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "budget": self._budget,
+        }
+
+    def _evict(self):
+        # the most recently used entry stays even if it alone exceeds the budget
+        while self._bytes > self._budget and len(self._entries) > 1:
+            key, pixmap = self._entries.popitem(last=False)
+            self._bytes -= pixmap_bytes(pixmap)
+            self._memory.untrack(self, key)
+            self.evictions += 1
@@ -0,0 +1,112 @@
+import datetime
+import time
+from typing import Optional, Set
+
+from PyQt5 import QtCore
+
+
+class SystemClock:
+    """Wall and monotonic time plus the timers running on them.
+
+    Widgets take their time and timers from a clock object so that other
+    clocks (simulated, synchronized) can be injected.
+    """
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def create_timer(self, parent: QtCore.QObject = None) -> QtCore.QTimer:
+        return QtCore.QTimer(parent)
+
+
+class SimulatedTimer(QtCore.QObject):
+    """QTimer stand-in which fires when its SimulatedClock is advanced."""
+
+    timeout = QtCore.pyqtSignal()
+
+    def __init__(self, clock: "SimulatedClock", parent: QtCore.QObject = None):
+        super().__init__(parent)
+        self._clock = clock
+        self._interval = 0
+        self._single_shot = False
+        self._due: Optional[float] = None
+
+    def setSingleShot(self, single_shot: bool):
+        self._single_shot = single_shot
+
+    def isSingleShot(self) -> bool:
+        return self._single_shot
+
+    def setTimerType(self, timer_type):
+        pass
+
+    def setInterval(self, msec):
+        self._interval = msec
+
+    def interval(self):
+        return self._interval
+
+    def isActive(self) -> bool:
+        return self._due is not None
+
+    def remainingTime(self) -> int:
+        if self._due is None:
+            return -1
+        return max(0, round(1000 * (self._due - self._clock.monotonic())))
+
+    def start(self, msec=None):
+        if msec is not None:
+            self._interval = msec
+        self._due = self._clock.monotonic() + self._interval / 1000
+        self._clock._timers.add(self)
+
+    def stop(self):
+        self._due = None
+        self._clock._timers.discard(self)
+
+
+class SimulatedClock(SystemClock):
+    """Clock which only moves when advance() is called.
+
+    Timers created by it fire in order of their due time while the clock is
+    advanced, so a show can be played back faster than real time.
+    """
+
+    def __init__(self, start: Optional[datetime.datetime] = None):
+        self._start = start if start is not None else datetime.datetime.now()
+        self._monotonic = 0.0
+        self._timers: Set[SimulatedTimer] = set()
+
+    def monotonic(self) -> float:
+        return self._monotonic
+
+    def now(self) -> datetime.datetime:
+        return self._start + datetime.timedelta(seconds=self._monotonic)
+
+    def create_timer(self, parent: QtCore.QObject = None) -> SimulatedTimer:
+        return SimulatedTimer(self, parent)
+
+    def advance(self, seconds: float):
+        target = self._monotonic + seconds
+        while True:
+            due = [t for t in self._timers if t._due is not None and t._due <= target]
+            if not due:
+                break
+            timer = min(due, key=lambda t: t._due)
+            self._monotonic = max(self._monotonic, timer._due)
+            if timer._single_shot:
+                timer.stop()
+            elif timer._interval > 0:
+                timer._due += timer._interval / 1000
+            else:
+                # like an idle QTimer, a zero interval fires once per pass
+                timer._due = target + 1e-6
+            try:
+                timer.timeout.emit()
+            except RuntimeError:
+                # the timer's parent was deleted
+                self._timers.discard(timer)
+        self._monotonic = target
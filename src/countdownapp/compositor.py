@@ -0,0 +1,56 @@
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+FRAME_HISTORY = 300
+
+
+class CompositorView(QtWidgets.QWidget):
+    """Paints background, slide and countdown of a gallery in one pass.
+
+    Replaces the stack of the PixmapView labels and the translucent
+    CountdownTimer label. Both keep computing their content, they just stop
+    showing it, and this widget draws it in its paintEvent.
+    """
+
+    def __init__(self, parent: QtWidgets.QWidget, view, timer):
+        super().__init__(parent)
+        self._view = view
+        self._timer = timer
+        self._timer_visible = True
+        self._frame_times: Deque[float] = deque(maxlen=FRAME_HISTORY)
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self._view.changed.connect(self.update)
+        self._timer.textDirty.connect(self._on_timer_dirty)
+
+    def setTimerVisible(self, visible: bool):
+        self._timer_visible = visible
+        self.update(self._timer.geometry())
+
+    def frame_stats(self) -> Dict[str, float]:
+        if not self._frame_times:
+            return {"frames": 0, "mean_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+        return {
+            "frames": len(self._frame_times),
+            "mean_ms": 1000 * sum(self._frame_times) / len(self._frame_times),
+            "max_ms": 1000 * max(self._frame_times),
+            "last_ms": 1000 * self._frame_times[-1],
+        }
+
+    def _on_timer_dirty(self, region: QtGui.QRegion):
+        if self._timer_visible:
+            self.update(region.translated(-self.pos()))
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        painter = QtGui.QPainter(self)
+        # the timer is our sibling, the view lives further down in the tree
+        parent = self.parentWidget()
+        view_offset = self._view.mapTo(parent, QtCore.QPoint(0, 0)) - self.pos()
+        self._view.paint_into(painter, view_offset)
+        if self._timer_visible:
+            self._timer.paint_into(painter, self._timer.pos() - self.pos())
+        painter.end()
+        self._frame_times.append(time.perf_counter() - start)
@@ -0,0 +1,197 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from PyQt5 import QtCore, QtGui
+
+from . import metrics
+
+DEFAULT_DISK_BUDGET_BYTES = 2 * 1024 * 1024 * 1024
+MAGIC = b"CDIC"
+VERSION = 1
+# magic, version, width, height, bytes per line, QImage format
+_HEADER = struct.Struct("<4sIIIII")
+# the pixels start page aligned, so they can be used right from the mapping
+HEADER_SIZE = 4096
+SUFFIX = ".raw"
+
+
+def default_directory() -> Path:
+    location = QtCore.QStandardPaths.writableLocation(
+        QtCore.QStandardPaths.StandardLocation.CacheLocation
+    )
+    if not location:
+        location = str(Path.home() / ".cache")
+    return Path(location) / "countdown-scaled"
+
+
+class DiskImageCache:
+    """Scaled slides and backgrounds kept on disk across runs.
+
+    Entries are keyed by the source file, its mtime and size and the target
+    size. They hold the raw pixels behind a small header, so loading one is
+    a memory mapped copy instead of a decode. Reading an entry bumps its
+    mtime; when the files exceed the budget the least recently used ones are
+    deleted. Writing and evicting happen on a background thread.
+    """
+
+    def __init__(self, directory: Path, budget_bytes: int = DEFAULT_DISK_BUDGET_BYTES):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._budget = budget_bytes
+        self._lock = threading.Lock()
+        # unknown until the first eviction pass has listed the directory
+        self._bytes: Optional[int] = None
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="countdown-disk")
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._writer.submit(self._evict)
+
+    def directory(self) -> Path:
+        return self._dir
+
+    def budget(self) -> int:
+        return self._budget
+
+    def set_budget(self, budget_bytes: int):
+        self._budget = max(0, budget_bytes)
+        self._writer.submit(self._evict)
+
+    def _path(self, source: Path, size: QtCore.QSize) -> Optional[Path]:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        key = (
+            f"{Path(source).resolve()}|{stat.st_mtime_ns}|{stat.st_size}"
+            f"|{size.width()}x{size.height()}"
+        )
+        return self._dir / (hashlib.sha1(key.encode()).hexdigest() + SUFFIX)
+
+    def contains(self, source: Path, size: QtCore.QSize) -> bool:
+        path = self._path(source, size)
+        return path is not None and path.exists()
+
+    def load(self, source: Path, size: QtCore.QSize) -> Optional[QtGui.QImage]:
+        path = self._path(source, size)
+        image = None if path is None else self._read(path)
+        if image is None:
+            self.misses += 1
+            metrics.count("disk_cache_misses")
+            return None
+        self.hits += 1
+        metrics.count("disk_cache_hits")
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return image
+
+    def _read(self, path: Path) -> Optional[QtGui.QImage]:
+        try:
+            with open(path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                if len(mapped) < HEADER_SIZE:
+                    return None
+                magic, version, width, height, stride, fmt = _HEADER.unpack_from(mapped)
+                if (
+                    magic != MAGIC
+                    or version != VERSION
+                    or len(mapped) != HEADER_SIZE + stride * height
+                ):
+                    return None
+                with metrics.timed("disk_cache_load_ms"):
+                    pixels = memoryview(mapped)[HEADER_SIZE:]
+                    try:
+                        wrapped = QtGui.QImage(
+                            pixels, width, height, stride, QtGui.QImage.Format(fmt)
+                        )
+                        # detach from the mapping before it is closed
+                        image = wrapped.copy()
+                        del wrapped
+                    finally:
+                        pixels.release()
+                return image
+        except (OSError, ValueError):
+            return None
+
+    def store(self, source: Path, size: QtCore.QSize, pixmap: QtGui.QPixmap):
+        # must be called on the GUI thread, the pixels are written later on
+        if self._budget <= 0:
+            return
+        path = self._path(source, size)
+        if path is None or path.exists():
+            return
+        self._writer.submit(self._write, path, pixmap.toImage())
+
+    def _write(self, path: Path, image: QtGui.QImage):
+        header = _HEADER.pack(
+            MAGIC,
+            VERSION,
+            image.width(),
+            image.height(),
+            image.bytesPerLine(),
+            int(image.format()),
+        )
+        temp = path.with_suffix(".tmp")
+        try:
+            with open(temp, "wb") as f:
+                f.write(header.ljust(HEADER_SIZE, b"\0"))
+                f.write(image.constBits().asstring(image.sizeInBytes()))
+            os.replace(temp, path)
+        except OSError:
+            return
+        self.writes += 1
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += HEADER_SIZE + image.sizeInBytes()
+        if self._bytes is None or self._bytes > self._budget:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self._dir) as it:
+            for entry in it:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, file_size, path in entries:
+            if total <= self._budget:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # still mapped by a reader on Windows, try next time
+                continue
+            total -= file_size
+            self.evictions += 1
+        with self._lock:
+            self._bytes = total
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self._bytes or 0,
+            "budget": self._budget,
+        }
+
+    def close(self):
+        self._writer.shutdown(wait=True)
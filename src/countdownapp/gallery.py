@@ -1,13 +1,31 @@
 import datetime
+import logging
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Optional
-
-from PyQt5 import QtCore, QtGui, QtMultimedia, QtMultimediaWidgets, QtWidgets, uic
-
-from .timer import CountdownTimer
-
-IMG_SUFFIXES = {".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".png"}
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from . import memory, metrics
+from .cache import ScaledPixmapCache, pixmap_bytes
+from .clock import SystemClock
+from .compositor import CompositorView
+from .diskcache import DiskImageCache, default_directory
+from .layout import CORNER_ALIGNMENTS, slide_rect, timer_rect
+from .playlist import Playlist
+from .prefetch import ImagePrefetcher, read_image
+from .prepare import PreparedFolder
+from .rescale import IDLE_MS, BackgroundRescaler, RescaleJob
+from .scanner import IMG_SUFFIXES, FolderScanner
+from .schedule import ScheduleEngine, Segment
+from .session import SessionAutosaver
+from .timer import CountdownTimer, format_remaining
+from .transitions import CUT, DEFAULT_DURATION_MS, TRANSITIONS, TransitionEngine
+from .watcher import FolderWatcher
+
+logger = logging.getLogger(__name__)
 
 
 def resource_path(relative_path: str) -> Path:
@@ -20,32 +38,219 @@ def resource_path(relative_path: str) -> Path:
     return base_path.joinpath(relative_path)
 
 
+def load_config_ui(widget: QtWidgets.QWidget):
+    # The form compiled by pyuic5 at build time saves parsing the .ui file
+    # and importing uic on every start; running from a source checkout falls
+    # back to loading config.ui if there is no (current) compiled form.
+    ui_file = resource_path("config.ui")
+    compiled = Path(__file__).with_name("_config_ui.py")
+    stale = (
+        not getattr(sys, "frozen", False)
+        and ui_file.exists()
+        and compiled.exists()
+        and compiled.stat().st_mtime < ui_file.stat().st_mtime
+    )
+    try:
+        if stale:
+            raise ImportError("compiled config form is outdated")
+        from ._config_ui import Ui_Form
+    except ImportError:
+        from PyQt5 import uic
+
+        with metrics.timed("startup.config_ui_load"):
+            uic.loadUi(ui_file, widget)
+        return
+    with metrics.timed("startup.config_ui_setup"):
+        form = Ui_Form()
+        form.setupUi(widget)
+        for name, child in vars(form).items():
+            setattr(widget, name, child)
+
+
 class PixmapView(QtWidgets.QWidget):
-    def __init__(self, parent: QtWidgets.QWidget):
+    slideSizeChanged = QtCore.pyqtSignal(QtCore.QSize)
+    # emitted instead of updating the labels while composited
+    changed = QtCore.pyqtSignal()
+
+    def __init__(
+        self,
+        parent: QtWidgets.QWidget,
+        scaled_cache: Optional[ScaledPixmapCache] = None,
+    ):
         super().__init__(parent)
 
         self._slideshow_paddings = [0, 0, 0, 0]
+        self._slide_size = QtCore.QSize()
+        if scaled_cache is None:
+            scaled_cache = ScaledPixmapCache()
+            metrics.register_gauge("scaled_cache", scaled_cache.stats)
+        # views on several screens share one, so each size is scaled once
+        self._scaled_cache = scaled_cache
+        self._bg_file: Optional[Path] = None
         self._bg_pic: Optional[QtGui.QPixmap] = None
+        self._disk_cache: Optional[DiskImageCache] = None
+        self._memory = memory.governor()
+        # once the size stays for a while what is shown is written to the
+        # disk cache and the originals behind it are dropped
+        self._settle_timer = QtCore.QTimer(self)
+        self._settle_timer.setSingleShot(True)
+        self._settle_timer.setInterval(1000)
+        self._settle_timer.timeout.connect(self._on_settled)
+        # while resized interactively fast copies are shown, keyed "bg" and
+        # "pic", until the smooth ones come from the rescaler
+        self._adaptive = True
+        self._previews: Set[str] = set()
+        # the last smooth copies, the fast ones are made from them
+        self._sharp: Dict[str, QtGui.QPixmap] = {}
+        self._refine_timer = QtCore.QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.setInterval(IDLE_MS)
+        self._refine_timer.timeout.connect(self._refine)
+        self._rescaler = BackgroundRescaler(self)
+        self._rescaler.scaled.connect(self._on_rescaled)
         self._bg_pic_label = QtWidgets.QLabel(self)
         self._pic: Optional[QtGui.QPixmap] = None
+        self._pic_source: Optional[Hashable] = None
+        # source and size of the smooth copy of the slide on screen, until
+        # there is one the original is kept
+        self._pic_done: Optional[Tuple[Hashable, QtCore.QSize]] = None
         self._pic_label = QtWidgets.QLabel(self)
         self._pic_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self._bg_scaled: Optional[QtGui.QPixmap] = None
+        self._pic_scaled: Optional[QtGui.QPixmap] = None
+        self._slides_rect = QtCore.QRect()
+        self._frame_visible = False
+        self._composited = False
+        self._transition = CUT
+        self._transition_ms = DEFAULT_DURATION_MS
+        # shown instead of the slide while a transition runs
+        self._transition_frame: Optional[QtGui.QPixmap] = None
+        self._transitions = TransitionEngine(self)
+        self._transitions.frameReady.connect(self._on_transition_frame)
+        self._transitions.finished.connect(self._on_transition_finished)
 
     def set_background_picture(self, filename: Path):
-        self._bg_pic = QtGui.QPixmap(str(filename))
+        # only decoded if no scaled copy is cached
+        self._bg_file = Path(filename)
+        self._set_original("bg", None)
         self.resizeEvent()
 
-    def set_next(self, pixmap: QtGui.QPixmap):
-        self._pic = pixmap
+    def set_disk_cache(self, disk_cache: Optional[DiskImageCache]):
+        self._disk_cache = disk_cache
+
+    def set_next(self, pixmap: QtGui.QPixmap, source: Optional[Hashable] = None):
+        source = pixmap.cacheKey() if source is None else source
+        if source == self._pic_source:
+            # decoded again for a larger size, the old copies are blurrier
+            self._scaled_cache.discard(source)
+            self._pic_done = None
+        previous = self._pic_scaled
+        # the source first, the governor may ask to release the original
+        # while it is registered
+        self._pic_source = source
+        self._set_original("pic", pixmap)
         self.resizeEvent()
+        if (
+            self._transition != CUT
+            and previous
+            and self._pic_scaled
+            and self.isVisible()
+        ):
+            # the frames are blended on a worker from copies of both slides
+            self._transitions.start(
+                self._transition,
+                previous.toImage(),
+                self._pic_scaled.toImage(),
+                self._slides_rect.size(),
+                self._transition_ms,
+            )
+
+    def set_transition(self, kind: str, duration_ms: int = DEFAULT_DURATION_MS):
+        self._transition = kind
+        self._transition_ms = duration_ms
+
+    def transition_stats(self) -> Dict[str, float]:
+        return self._transitions.last_stats()
+
+    def _on_transition_frame(self, frame: QtGui.QImage):
+        pixmap = QtGui.QPixmap.fromImage(frame)
+        pixmap.setDevicePixelRatio(frame.devicePixelRatio())
+        self._transition_frame = pixmap
+        self._show_slide()
+
+    def _on_transition_finished(self, stats: Dict):
+        self._transition_frame = None
+        self._show_slide()
+
+    def _show_slide(self):
+        if self._composited:
+            self.changed.emit()
+        else:
+            self._update_labels()
 
     def clear(self):
-        self._pic = None
+        self._set_original("pic", None)
+        self._pic_source = None
         self.resizeEvent()
 
+    def _set_original(self, key: str, pixmap: Optional[QtGui.QPixmap]):
+        if key == "bg":
+            self._bg_pic = pixmap
+        else:
+            self._pic = pixmap
+        if pixmap:
+            self._memory.track(self, key, pixmap_bytes(pixmap), "original")
+        else:
+            self._memory.untrack(self, key)
+
+    def reload_picture(self, source: Optional[str] = None):
+        """Scales the slide again from its file, which was decoded for a
+        smaller size, or from source, another file of the same image."""
+        size = self._slides_rect.size()
+        pic = self._pic
+        if not isinstance(self._pic_source, str) or (
+            pic and pic.width() >= size.width() and pic.height() >= size.height()
+        ):
+            return
+        self._set_original("pic", None)
+        self._scaled_cache.discard(self._pic_source)
+        if source is not None:
+            self._pic_source = source
+        self._pic_done = None
+        if not self._adaptive:
+            self._rescale(interactive=False)
+            return
+        # what is shown stays until the rescaler has read the file
+        self._previews.add("pic")
+        self._refine_timer.start()
+
+    def release_memory(self, key: str) -> bool:
+        # only originals which can be read from their file again
+        if key == "bg" and self._bg_file is not None:
+            self._bg_pic = None
+            return True
+        if (
+            key == "pic"
+            and isinstance(self._pic_source, str)
+            and self._pic_done == (self._pic_source, self._slides_rect.size())
+            and os.path.isfile(self._pic_source)
+        ):
+            self._pic = None
+            return True
+        return False
+
+    def setScaledCacheBudget(self, budget_bytes: int):
+        self._scaled_cache.set_budget(budget_bytes)
+
+    def scaled_cache_stats(self) -> Dict[str, int]:
+        return self._scaled_cache.stats()
+
+    def scaled_cache(self) -> ScaledPixmapCache:
+        return self._scaled_cache
+
     def calc_margins(self, outside, inside):
-        horizontal_margin = (outside.width() - inside.width()) / 2
-        vertical_margin = (outside.height() - inside.height()) / 2
+        horizontal_margin = (outside.width() - inside.width()) // 2
+        vertical_margin = (outside.height() - inside.height()) // 2
         return QtCore.QMargins(
             -horizontal_margin,
             -vertical_margin,
@@ -56,94 +261,712 @@ class PixmapView(QtWidgets.QWidget):
     def setSlideShowPaddings(self, paddings):
         if len(paddings) == 4:
             self._slideshow_paddings = paddings
-            self.resizeEvent()
+            self._rescale(interactive=True)
 
-    def resizeEvent(self, event=None):
+    def set_adaptive_scaling(self, enabled: bool):
+        # without it every resize is scaled smoothly right away
+        self._adaptive = enabled
+        if not enabled and self._previews:
+            self._rescale(interactive=False)
+
+    def _update_labels(self):
         size = self.size()
-        if self._bg_pic:
-            scaled = self._bg_pic.scaled(
-                size,
-                QtCore.Qt.AspectRatioMode.KeepAspectRatio,
-                QtCore.Qt.TransformationMode.SmoothTransformation,
-            )
-            self._bg_pic_label.setPixmap(scaled)
+        if self._bg_scaled:
+            self._bg_pic_label.setPixmap(self._bg_scaled)
             self._bg_pic_label.setContentsMargins(
-                self.calc_margins(size, scaled.size())
+                self.calc_margins(size, self._bg_scaled.size())
             )
         else:
             self._bg_pic_label.setStyleSheet("background-color: black")
         self._bg_pic_label.setGeometry(0, 0, size.width(), size.height())
 
-        p = self._slideshow_paddings.copy()
-        w = size.width()
-        h = size.height()
-        p[0] = p[0] / 100 * h
-        p[1] = p[1] / 100 * w
-        p[2] = p[2] / 100 * h
-        p[3] = p[3] / 100 * w
-        slides_size = QtCore.QSize(w - (p[1] + p[3]), h - (p[0] + p[2]))
-        if self._pic:
+        slide = self._transition_frame or self._pic_scaled
+        if slide:
             self._pic_label.show()
-            scaled = self._pic.scaled(
-                slides_size,
+            self._pic_label.setPixmap(slide)
+        else:
+            self._pic_label.hide()
+        self._pic_label.setGeometry(self._slides_rect)
+
+    def slide_size(self) -> QtCore.QSize:
+        return slide_rect(self.size(), self._slideshow_paddings).size()
+
+    def set_frame_visible(self, visible: bool):
+        self._frame_visible = visible
+        if visible:
+            self._pic_label.setStyleSheet("border: 1px solid red")
+        else:
+            self._pic_label.setStyleSheet("")
+        if self._composited:
+            self.changed.emit()
+
+    def set_composited(self, composited: bool):
+        # While composited another widget paints our content via paint_into()
+        self._composited = composited
+        self._bg_pic_label.setHidden(composited)
+        if composited:
+            self._pic_label.hide()
+        self.resizeEvent()
+
+    def paint_into(self, painter: QtGui.QPainter, offset: QtCore.QPoint):
+        center = QtCore.Qt.AlignmentFlag.AlignCenter
+        direction = QtCore.Qt.LayoutDirection.LeftToRight
+        area = QtCore.QRect(offset, self.size())
+        painter.fillRect(area, QtCore.Qt.GlobalColor.black)
+        if self._bg_scaled:
+            target = QtWidgets.QStyle.alignedRect(
+                direction, center, self._bg_scaled.size(), area
+            )
+            painter.drawPixmap(target.topLeft(), self._bg_scaled)
+        slides_area = self._slides_rect.translated(offset)
+        slide = self._transition_frame or self._pic_scaled
+        if slide:
+            # transition frames may have fewer pixels than they cover
+            target = QtWidgets.QStyle.alignedRect(
+                direction, center, slide.size() / slide.devicePixelRatio(), slides_area
+            )
+            painter.drawPixmap(target.topLeft(), slide)
+        if self._frame_visible:
+            painter.setPen(QtGui.QPen(QtGui.QColor("red"), 1))
+            painter.drawRect(slides_area.adjusted(0, 0, -1, -1))
+
+    def _scaled_background(self, size: QtCore.QSize) -> Optional[QtGui.QPixmap]:
+        if self._bg_file is None:
+            if not self._bg_pic:
+                return None
+            return self._scaled_cache.scaled(
+                self._bg_pic.cacheKey(), self._bg_pic, size
+            )
+        source = str(self._bg_file)
+        scaled = self._scaled_cache.lookup(source, size)
+        if scaled is not None:
+            return scaled
+        image = None
+        if self._disk_cache is not None:
+            image = self._disk_cache.load(self._bg_file, size)
+        if image is not None:
+            scaled = QtGui.QPixmap.fromImage(image)
+        else:
+            # held locally, the governor may drop the original right away
+            original = self._bg_pic
+            if original is None:
+                original = QtGui.QPixmap(source)
+                self._set_original("bg", original)
+            if original.isNull():
+                return None
+            with metrics.timed("scale_ms"):
+                scaled = original.scaled(
+                    size,
+                    QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+                    QtCore.Qt.TransformationMode.SmoothTransformation,
+                )
+        self._scaled_cache.insert(source, size, scaled)
+        return scaled
+
+    def _scaled_picture(self, size: QtCore.QSize) -> Optional[QtGui.QPixmap]:
+        source = self._pic_source
+        if not isinstance(source, str):
+            if not self._pic:
+                return None
+            return self._scaled_cache.scaled(source, self._pic, size)
+        # copies of files are keyed by name, so they outlive the original
+        scaled = self._scaled_cache.lookup(source, size)
+        if scaled is not None:
+            return scaled
+        original = self._pic
+        if original is None:
+            image = None
+            if self._disk_cache is not None:
+                image = self._disk_cache.load(Path(source), size)
+            if image is None:
+                image = read_image(Path(source), size)
+            original = QtGui.QPixmap.fromImage(image)
+            self._set_original("pic", original)
+        if not original:
+            return None
+        with metrics.timed("scale_ms"):
+            scaled = original.scaled(
+                size,
                 QtCore.Qt.AspectRatioMode.KeepAspectRatio,
                 QtCore.Qt.TransformationMode.SmoothTransformation,
             )
-            self._pic_label.setPixmap(scaled)
+        self._scaled_cache.insert(source, size, scaled)
+        return scaled
+
+    def _on_settled(self):
+        self._persist()
+        # only the scaled copies are painted, the originals are needed again
+        # for another size and then read from their files; fast copies are
+        # still waiting for their smooth ones
+        for key, scaled in (("bg", self._bg_scaled), ("pic", self._pic_scaled)):
+            if scaled and key not in self._previews and self.release_memory(key):
+                self._memory.untrack(self, key)
+
+    def _persist(self):
+        if self._disk_cache is None:
+            return
+        if self._bg_file is not None and self._bg_scaled and "bg" not in self._previews:
+            self._disk_cache.store(self._bg_file, self.size(), self._bg_scaled)
+        if (
+            isinstance(self._pic_source, str)
+            and self._pic_scaled
+            and "pic" not in self._previews
+        ):
+            self._disk_cache.store(
+                Path(self._pic_source), self._slides_rect.size(), self._pic_scaled
+            )
+
+    def _preview(
+        self,
+        key: str,
+        source: Hashable,
+        original: Optional[QtGui.QPixmap],
+        size: QtCore.QSize,
+    ) -> Optional[QtGui.QPixmap]:
+        if isinstance(source, str):
+            scaled = self._scaled_cache.lookup(source, size)
+            if scaled is not None:
+                self._previews.discard(key)
+                self._sharp[key] = scaled
+                return scaled
+        # the last smooth copy has far fewer pixels to sample than the original
+        base = self._sharp.get(key) or original
+        if not base:
+            return None
+        self._previews.add(key)
+        with metrics.timed("fast_scale_ms"):
+            return base.scaled(
+                size,
+                QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+                QtCore.Qt.TransformationMode.FastTransformation,
+            )
+
+    def _refine(self):
+        # the size has stayed, views on slides decoded too small reload first
+        self._emit_slide_size()
+        # a reload the slideshow asked for just now is part of these jobs
+        self._refine_timer.stop()
+        jobs = []
+        if "bg" in self._previews:
+            jobs.append(
+                self._rescale_job("bg", self._bg_file, self._bg_pic, self.size())
+            )
+        if "pic" in self._previews:
+            source = self._pic_source
+            path = Path(source) if isinstance(source, str) else None
+            jobs.append(
+                self._rescale_job("pic", path, self._pic, self._slides_rect.size())
+            )
+        self._rescaler.request(job for job in jobs if job is not None)
+
+    def _rescale_job(
+        self,
+        key: str,
+        path: Optional[Path],
+        original: Optional[QtGui.QPixmap],
+        size: QtCore.QSize,
+    ) -> Optional[RescaleJob]:
+        source = self._bg_source() if key == "bg" else self._pic_source
+        if path is not None and self._disk_cache is not None:
+            image = self._disk_cache.load(path, size)
+            if image is not None:
+                self._on_rescaled(key, source, size, image)
+                return None
+        if original:
+            # QPixmaps stay on the GUI thread, the worker scales a QImage
+            return (key, source, original.toImage(), None, size)
+        if path is not None:
+            return (key, source, None, str(path), size)
+        return None
+
+    def _on_rescaled(
+        self, key: str, source: Hashable, size: QtCore.QSize, image: QtGui.QImage
+    ):
+        if key == "bg":
+            current = (self._bg_source(), self.size())
         else:
-            self._pic_label.hide()
-        self._pic_label.setGeometry(
-            p[3], p[0], slides_size.width(), slides_size.height()
+            current = (self._pic_source, self._slides_rect.size())
+        if (source, size) != current or key not in self._previews:
+            return
+        scaled = QtGui.QPixmap.fromImage(image)
+        if isinstance(source, str):
+            self._scaled_cache.insert(source, size, scaled)
+        if key == "bg":
+            self._bg_scaled = scaled
+        else:
+            self._pic_scaled = scaled
+            self._pic_done = (source, size)
+        self._sharp[key] = scaled
+        self._previews.discard(key)
+        self._show_slide()
+        self._settle_timer.start()
+
+    def _bg_source(self) -> Optional[Hashable]:
+        if self._bg_file is not None:
+            return str(self._bg_file)
+        return self._bg_pic.cacheKey() if self._bg_pic else None
+
+    def _emit_slide_size(self):
+        slides_size = self._slides_rect.size()
+        if slides_size != self._slide_size:
+            self._slide_size = slides_size
+            self.slideSizeChanged.emit(slides_size)
+
+    def resizeEvent(self, event=None):
+        # sizes changed by the user come with an event, new content without
+        self._rescale(interactive=event is not None)
+
+    def _rescale(self, interactive: bool):
+        size = self.size()
+        # a running transition ends in a cut
+        self._transitions.cancel()
+        self._transition_frame = None
+        # the copies on screen stay when the memory governor needs room
+        bg_source = self._bg_source()
+        self._slides_rect = slide_rect(size, self._slideshow_paddings)
+        slides_size = self._slides_rect.size()
+        self._scaled_cache.pin(
+            [(bg_source, size), (self._pic_source, slides_size)], holder=id(self)
         )
+        # smooth copies still being made are for a size that is gone
+        self._rescaler.cancel()
+        if interactive and self._adaptive:
+            self._bg_scaled = self._preview("bg", bg_source, self._bg_pic, size)
+            self._pic_scaled = self._preview(
+                "pic", self._pic_source, self._pic, slides_size
+            )
+            if "pic" in self._previews:
+                self._pic_done = None
+            elif self._pic_scaled:
+                self._pic_done = (self._pic_source, slides_size)
+            # the slideshow hears of the new size once it has stayed
+            self._refine_timer.start()
+        else:
+            self._refine_timer.stop()
+            self._previews.clear()
+            self._bg_scaled = self._scaled_background(size)
+            self._pic_scaled = self._scaled_picture(slides_size)
+            self._pic_done = (
+                (self._pic_source, slides_size) if self._pic_scaled else None
+            )
+            self._sharp = {"bg": self._bg_scaled, "pic": self._pic_scaled}
+            self._emit_slide_size()
+
+        self._show_slide()
+        self._settle_timer.start()
 
 
 class Slideshow(QtWidgets.QWidget):
-    def __init__(self, parent: QtWidgets.QWidget):
+    # playlist position of the slide just shown
+    slideShown = QtCore.pyqtSignal(int)
+
+    def __init__(self, parent: QtWidgets.QWidget, clock: Optional[SystemClock] = None):
         super().__init__(parent)
-        self._timer = QtCore.QTimer(self)
+        self._clock = clock if clock is not None else SystemClock()
+        self._timer = self._clock.create_timer(self)
+        # a coarse timer may fire late by 5% of the pause, out of step with
+        # synced instances
+        self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
         self._timer.timeout.connect(self.timerEvent)
+        self._prefetcher = ImagePrefetcher(self)
+        self._scanner = FolderScanner(IMG_SUFFIXES, self)
+        self._scanner.batchFound.connect(self._on_scan_batch_found)
+        self._scanner.finished.connect(self._on_scan_finished)
+        self._watcher = FolderWatcher(IMG_SUFFIXES, self)
+        self._watcher.filesAdded.connect(self._on_files_added)
+        self._watcher.filesRemoved.connect(self._on_files_removed)
+        # the next show, scanned and decoded while the current one runs
+        self._next_scanner = FolderScanner(IMG_SUFFIXES, self)
+        self._next_scanner.finished.connect(self._on_next_scan_finished)
+        self._next_prefetcher = ImagePrefetcher(self)
+        self._next_folder: Optional[Tuple[Path, bool]] = None
+        self._next_listing: Optional[Tuple[List[str], List[str]]] = None
+        self._folder: Optional[Path] = None
+        self._recursive = False
+        self._playlist = Playlist()
+        self._prepared = PreparedFolder(Path())
+        self._disk_cache: Optional[DiskImageCache] = None
+        self._image_file: Optional[Path] = None
+        # without autoplay slides only change when told to, e.g. by a sync leader
+        self._autoplay = True
+        # slide size the current image was decoded for, None for full size
+        self._decoded_size: Optional[QtCore.QSize] = None
         self._init_ui()
 
-    def start(self, folder: Path):
-        self.images = [f for f in folder.iterdir() if f.suffix.lower() in IMG_SUFFIXES]
-        if self.images:
-            self.images.sort()
-            self._image_file = self.images[0]
-            self.show_next_image()
+    def start(self, folder: Path, recursive: bool = False):
+        if self._next_folder == (folder, recursive) and self._next_listing:
+            # prepared: no scan, and the first slides are decoded already
+            filenames, directories = self._next_listing
+            self._next_folder = None
+            self._next_listing = None
+            self._prefetcher.cancel()
+            self._prefetcher, self._next_prefetcher = (
+                self._next_prefetcher,
+                self._prefetcher,
+            )
+            self._prefetcher.set_lookahead(self._next_prefetcher.lookahead())
+            self._resume(folder, recursive, filenames, directories, 0, None)
+            return
+        if self._next_folder == (folder, recursive):
+            # started before its preparation finished
+            self._next_scanner.cancel()
+            self._next_folder = None
+        # the show starts with the first image found, the rest of the folder
+        # is fed into the playlist while the scan continues
+        self._timer.stop()
+        self._watcher.stop()
+        self._prefetcher.cancel()
+        self._playlist.clear()
+        self._image_file = None
+        self._folder = folder
+        self._recursive = recursive
+        # display sized copies made by CountdownPrepare.py are used if current
+        self._prepared = PreparedFolder.load(folder)
+        self._scanner.scan(folder, recursive)
+
+    def resume(
+        self,
+        folder: Path,
+        recursive: bool,
+        filenames: List[str],
+        directories: List[str],
+        position: int,
+        seed: Optional[int],
+    ):
+        """Continues a show from a saved playlist instead of scanning the
+        folder. Changes made to the folder meanwhile come from the watcher."""
+        self._prefetcher.cancel()
+        self._resume(folder, recursive, filenames, directories, position, seed)
+        self._watcher.recheck()
+
+    def _resume(
+        self,
+        folder: Path,
+        recursive: bool,
+        filenames: List[str],
+        directories: List[str],
+        position: int,
+        seed: Optional[int],
+    ):
+        self._scanner.cancel()
+        self._timer.stop()
+        self._watcher.stop()
+        self._folder = folder
+        self._recursive = recursive
+        self._prepared = PreparedFolder.load(folder)
+        self._playlist.clear()
+        self._playlist.extend(Path(f) for f in filenames)
+        self._playlist.set_shuffle(seed)
+        self._image_file = None
+        if len(self._playlist):
+            self._image_file = self._playlist.seek(position)
+            self._show_image(self._image_file)
+            self._start_timer()
+            self._prefetch_ahead()
+        self._watcher.watch(folder, recursive, filenames, directories)
+
+    def prepare(self, folder: Path, recursive: bool = False):
+        """Scans folder and decodes its first slides in the background, so a
+        later start() with the same folder shows them without waiting."""
+        if self._next_folder == (folder, recursive):
+            return
+        self._next_folder = (folder, recursive)
+        self._next_listing = None
+        self._next_prefetcher.cancel()
+        self._next_scanner.scan(folder, recursive)
+
+    def _on_next_scan_finished(
+        self, generation: int, filenames: List[str], directories: List[str]
+    ):
+        if generation != self._next_scanner.generation() or not self._next_folder:
+            return
+        self._next_listing = (filenames, directories)
+        prepared = PreparedFolder.load(self._next_folder[0])
+        size = self.slide_size()
+        self._next_prefetcher.set_target_size(size)
+        self._next_prefetcher.set_lookahead(self._prefetcher.lookahead() + 1)
+        self._next_prefetcher.request(
+            prepared.resolve(Path(f), size)
+            for f in filenames[: self._next_prefetcher.lookahead()]
+        )
+
+    def session_state(self) -> Dict:
+        # saved every few seconds, the playlist itself only when it changed
+        if self._folder is None:
+            return {}
+        state = {"folder": str(self._folder), "recursive": self._recursive}
+        if self.playlist_key() is not None:
+            state.update(
+                position=self._playlist.position(),
+                seed=self._playlist.shuffle_seed(),
+            )
+        return state
+
+    def playlist_key(self) -> Optional[Tuple]:
+        """Changes whenever playlist_state() does; None while the folder is
+        still scanned, a resume scans it again then."""
+        if self._folder is None:
+            return None
+        directories = self._watcher.directories()
+        if not directories:
+            return None
+        return (
+            str(self._folder),
+            self._recursive,
+            self._playlist.revision(),
+            len(directories),
+        )
+
+    def playlist_state(self) -> Callable[[], Dict]:
+        # the names of a large playlist take a while, they are listed from a
+        # copy by the caller, e.g. on the autosaver's thread
+        playlist = self._playlist.copy()
+        directories = self._watcher.directories()
+        # names relative to the folder keep large playlists small
+        start = len(os.path.join(str(self._folder), ""))
+
+        def state() -> Dict:
+            return {
+                "files": [name[start:] for name in playlist.names()],
+                "directories": [d[start:] for d in directories if len(d) > start],
+            }
+
+        return state
+
+    def restore_session(self, state: Dict):
+        if not state.get("folder"):
+            return
+        folder = Path(state["folder"])
+        recursive = state.get("recursive", False)
+        if "files" not in state:
+            self.start(folder, recursive)
+            return
+        self.resume(
+            folder,
+            recursive,
+            [os.path.join(folder, f) for f in state["files"]],
+            [os.path.join(folder, d) for d in state.get("directories", [])],
+            state.get("position", 0),
+            state.get("seed"),
+        )
+
+    def _on_scan_batch_found(self, generation: int, filenames: List[str]):
+        if generation != self._scanner.generation():
+            return
+        self._playlist.extend(Path(f) for f in filenames)
+        if self._image_file is None:
+            self._image_file = self._playlist.seek(0)
+            self._show_image(self._image_file)
+            self._start_timer()
+        self._prefetch_ahead()
+
+    def _on_scan_finished(
+        self, generation: int, filenames: List[str], directories: List[str]
+    ):
+        if generation != self._scanner.generation():
+            return
+        self._playlist.replace(Path(f) for f in filenames)
+        if self._image_file is not None:
+            self._prefetch_ahead()
+        # from now on changes to the folder are applied to the playlist
+        # instead of scanning it again
+        self._watcher.watch(self._folder, self._recursive, filenames, directories)
+
+    def _on_files_added(self, filenames: List[str]):
+        self._playlist.insert_sorted(Path(f) for f in filenames)
+        if self._image_file is None:
+            self._image_file = self._playlist.seek(0)
+            self._show_image(self._image_file)
+            self._start_timer()
+        self._prefetch_ahead()
+
+    def _on_files_removed(self, filenames: List[str]):
+        if not self._playlist.remove(Path(f) for f in filenames):
+            return
+        if not len(self._playlist):
+            self._image_file = None
+            self._timer.stop()
+            self._prefetcher.cancel()
+            for view in self._views:
+                view.clear()
+            return
+        # the slide on screen stays until the next one is due
+        self._image_file = self._playlist.current()
+        self._prefetch_ahead()
+
+    def playlist(self) -> Playlist:
+        return self._playlist
+
+    def position(self) -> Optional[int]:
+        if self._image_file is None or not len(self._playlist):
+            return None
+        return self._playlist.position()
+
+    def next_change_ms(self) -> Optional[int]:
+        # time until the next slide, None if the show is not running
+        if not self._timer.isActive():
+            return None
+        return self._timer.remainingTime()
+
+    def set_autoplay(self, enabled: bool):
+        self._autoplay = enabled
+        if not enabled:
+            self._timer.stop()
+        elif self._image_file is not None:
+            self._start_timer()
+
+    def _start_timer(self):
+        if self._autoplay:
             self._timer.start()
 
+    def set_shuffle(self, seed: Optional[int]):
+        self._playlist.set_shuffle(seed)
+        if self._image_file is not None:
+            self._prefetch_ahead()
+
     def stop(self):
+        self._scanner.cancel()
+        self._watcher.stop()
         self._timer.stop()
-        self._view.clear()
+        self._prefetcher.cancel()
+        self._image_file = None
+        for view in self._views:
+            view.clear()
 
     def timerEvent(self):
         self.show_next_image()
 
     def show_next_image(self):
-        index = self.images.index(self._image_file)
-        new_index = (index + 1) % len(self.images)
-        self._image_file = self.images[new_index]
-        pixmap = QtGui.QPixmap(str(self._image_file))
-        self.set_pixmap(pixmap)
+        self._image_file = self._playlist.next()
+        self._show_image(self._image_file)
+        self._prefetch_ahead()
+
+    def show_previous_image(self):
+        self._image_file = self._playlist.previous()
+        self._show_image(self._image_file)
+        self._prefetch_ahead()
+
+    def seek(self, position: int):
+        self._image_file = self._playlist.seek(position)
+        self._show_image(self._image_file)
+        self._prefetch_ahead()
+
+    def _show_image(self, filename: Path):
+        target_size = self.slide_size()
+        source = self._prepared.resolve(filename, target_size)
+        image = self._prefetcher.take(source)
+        if image is not None:
+            metrics.count("prefetch_hits")
+        elif self._disk_cache is not None and not target_size.isEmpty():
+            image = self._disk_cache.load(source, target_size)
+        if image is None:
+            metrics.count("prefetch_misses")
+            image = read_image(source, target_size)
+        self._decoded_size = None if target_size.isEmpty() else target_size
+        self.set_pixmap(QtGui.QPixmap.fromImage(image), str(source))
+        self.slideShown.emit(self._playlist.position())
+
+    def _needs_reload(self, size: QtCore.QSize) -> bool:
+        decoded = self._decoded_size
+        pic = self._view._pic
+        if decoded is None or not pic:
+            return False
+        if size.width() <= decoded.width() and size.height() <= decoded.height():
+            return False
+        # only images that were shrunk while decoding gain detail from a reload
+        return pic.width() >= decoded.width() or pic.height() >= decoded.height()
+
+    def slide_size(self) -> QtCore.QSize:
+        # slides are decoded once for the largest view, the others scale down
+        size = QtCore.QSize(0, 0)
+        for view in self._views:
+            size = size.expandedTo(view.slide_size())
+        return size
+
+    def add_view(self, view: PixmapView):
+        """Shows the slides on another view, e.g. on another screen."""
+        self._views.append(view)
+        view.slideSizeChanged.connect(self._on_slide_size_changed)
+        view.set_disk_cache(self._disk_cache)
+        if self._view._bg_file is not None:
+            view.set_background_picture(self._view._bg_file)
+        view.set_transition(self._view._transition, self._view._transition_ms)
+        view.set_adaptive_scaling(self._view._adaptive)
+        self._prefetcher.set_target_size(self.slide_size())
+        if self._image_file is not None:
+            self._show_image(self._image_file)
+            self._prefetch_ahead()
+
+    def remove_view(self, view: PixmapView):
+        if view in self._views and view is not self._view:
+            self._views.remove(view)
+            view.slideSizeChanged.disconnect(self._on_slide_size_changed)
+            view.scaled_cache().unpin(id(view))
+
+    def _on_slide_size_changed(self, *_):
+        size = self.slide_size()
+        self._prefetcher.set_target_size(size)
+        if self._image_file is None or not len(self._playlist):
+            return
+        source = self._prepared.resolve(self._image_file, size)
+        # a prepared copy which got too small is replaced by the original
+        if self._needs_reload(size) or (
+            source == self._image_file and str(source) != self._view._pic_source
+        ):
+            # the views keep showing the slide and read it again on a worker
+            self._decoded_size = QtCore.QSize(size)
+            for view in self._views:
+                view.reload_picture(str(source))
+        self._prefetch_ahead()
+
+    def _prefetch_ahead(self):
+        depth = min(self._prefetcher.lookahead(), len(self._playlist) - 1)
+        size = self.slide_size()
+        self._prefetcher.request(
+            self._prepared.resolve(self._playlist.peek(offset), size)
+            for offset in range(1, depth + 1)
+        )
+
+    def set_disk_cache(self, disk_cache: Optional[DiskImageCache]):
+        self._disk_cache = disk_cache
+        # the prefetchers skip slides the disk cache has, on their workers
+        self._prefetcher.set_disk_cache(disk_cache)
+        self._next_prefetcher.set_disk_cache(disk_cache)
+        for view in self._views:
+            view.set_disk_cache(disk_cache)
+
+    def set_lookahead(self, depth: int):
+        self._prefetcher.set_lookahead(depth)
+
+    def set_adaptive_scaling(self, enabled: bool):
+        for view in self._views:
+            view.set_adaptive_scaling(enabled)
+
+    def set_transition(self, kind: str, duration_ms: int = DEFAULT_DURATION_MS):
+        for view in self._views:
+            view.set_transition(kind, duration_ms)
 
     def set_pause(self, pause_s):
         if self._timer is not None:
             self._timer.setInterval(pause_s * 1000)
 
     def set_background_picture(self, filename: Path):
-        self._view.set_background_picture(filename)
+        for view in self._views:
+            view.set_background_picture(filename)
 
-    def set_pixmap(self, pixmap):
-        self._view.set_next(pixmap)
+    def set_pixmap(self, pixmap, source: Optional[Hashable] = None):
+        # the views share the pixmap and the cache of its scaled copies
+        for view in self._views:
+            view.set_next(pixmap, source)
 
     def _init_ui(self):
         self._view = PixmapView(self)
+        self._view.slideSizeChanged.connect(self._on_slide_size_changed)
+        self._views: List[PixmapView] = [self._view]
 
     def showFrame(self, visible: bool):
-        if visible:
-            self._view._pic_label.setStyleSheet("border: 1px solid red")
-        else:
-            self._view._pic_label.setStyleSheet("")
+        for view in self._views:
+            view.set_frame_visible(visible)
 
     def resizeEvent(self, event):
         size = self.size()
@@ -151,19 +974,44 @@ class Slideshow(QtWidgets.QWidget):
 
 
 class GalleryCountdownWindow(QtWidgets.QMainWindow):
-    def __init__(self):
+    musicPlayerCreated = QtCore.pyqtSignal(QtCore.QObject)
+
+    def __init__(self, clock: Optional[SystemClock] = None):
         super().__init__()
+        # a SyncedClock makes slides and countdown run on a sync leader's time
+        self._clock = clock if clock is not None else SystemClock()
+        self._sync = None
+        # the deadline announced by a sync leader, local edits don't move it
+        self._leader_end_time: Optional[datetime.datetime] = None
+        self._autosaver: Optional[SessionAutosaver] = None
+        self._schedule: Optional[ScheduleEngine] = None
+        self._segment_end_time: Optional[datetime.datetime] = None
+        # where the music was last moved to, so it ends with the countdown
+        self._music_offset_ms: Optional[int] = None
         self._timerWidget = None
         self._slidesWidget = None
         self._video_widget = None
         self._shortcut_help_label = None
         self._is_fullscreen = False
         self._timerCorner = 3
-        self._music_player = QtMultimedia.QMediaPlayer()
+        self._timer_visible = True
+        self._compositor: Optional[CompositorView] = None
+        # the multimedia stack is only loaded once music or a video is chosen
+        self._music_player = None
+        self._video_player = None
+        # the end video is opened and paused this many seconds before the end
+        self._video_lead_s = 10
+        self._prepared_video: Optional[str] = None
+        self._video_started = False
+        self._handoff_started: Optional[float] = None
         self._auto_quit = True
-        self._init_ui()
-        self._config_window = GalleryConfigWindow(self)
-        self._config_window.show()
+        # more screens showing the same slides and countdown
+        self._outputs: List["OutputWindow"] = []
+        with metrics.timed("startup.main_window"):
+            self._init_ui()
+        with metrics.timed("startup.config_window"):
+            self._config_window = GalleryConfigWindow(self)
+            self._config_window.show()
 
     def _init_ui(self):
         self.setWindowTitle("Countdown Galerie")
@@ -177,11 +1025,22 @@ class GalleryCountdownWindow(QtWidgets.QMainWindow):
         self._widget = QtWidgets.QFrame()
 
         # create slideshow
-        self._slidesWidget = Slideshow(self._widget)
+        self._slidesWidget = Slideshow(self._widget, self._clock)
+        # scaled slides survive a restart of the app
+        try:
+            self._disk_cache = DiskImageCache(default_directory())
+        except OSError as e:
+            logger.warning("no disk cache for scaled images: %s", e)
+            self._disk_cache = None
+        self._slidesWidget.set_disk_cache(self._disk_cache)
+        if self._disk_cache is not None:
+            metrics.register_gauge("disk_cache", self._disk_cache.stats)
 
         # create timer
-        self._timerWidget = CountdownTimer(self._widget)
+        self._timerWidget = CountdownTimer(self._widget, self._clock)
         self._timerWidget.finished.connect(self._on_timer_finished)
+        self._timerWidget.ticked.connect(self._on_timer_ticked)
+        self._timerWidget.geometryHintChanged.connect(self._place_timer)
 
         # create keyboard hint
         self._shortcut_help_label = QtWidgets.QLabel(self)
@@ -198,15 +1057,44 @@ class GalleryCountdownWindow(QtWidgets.QMainWindow):
 
         self._stacked_widget.addWidget(self._widget)
 
+        self._stacked_widget.setCurrentWidget(self._widget)
+
+        self.setFullScreen(self._is_fullscreen)
+
+        QtCore.QMetaObject.connectSlotsByName(self)
+
+    def music_player(self):
+        if self._music_player is None:
+            with metrics.timed("multimedia.music_player_init"):
+                from PyQt5 import QtMultimedia
+
+                self._music_player = QtMultimedia.QMediaPlayer()
+            self.musicPlayerCreated.emit(self._music_player)
+        return self._music_player
+
+    def video_player(self):
+        if self._video_player is None:
+            with metrics.timed("multimedia.video_player_init"):
+                self._init_video_player()
+        return self._video_player
+
+    def _init_video_player(self):
+        from PyQt5 import QtMultimedia, QtMultimediaWidgets
+
         # central video player widget
         self._video_widget = QtMultimediaWidgets.QVideoWidget(self._widget)
         self._video_widget.hide()
         self._video_widget.lower()
+        self._video_widget.setGeometry(self.rect())
 
         self._video_player = QtMultimedia.QMediaPlayer(
             None, QtMultimedia.QMediaPlayer.VideoSurface
         )
-        self._video_player.error.connect(lambda x: print(x))
+        self._video_player.error.connect(
+            lambda error: logger.warning(
+                "video error %s: %s", error, self._video_player.errorString()
+            )
+        )
         self._video_player.setVideoOutput(self._video_widget)
         self._video_player.stateChanged[QtMultimedia.QMediaPlayer.State].connect(
             self._on_video_state_changed
@@ -214,31 +1102,230 @@ class GalleryCountdownWindow(QtWidgets.QMainWindow):
         self._video_player.mediaStatusChanged[
             QtMultimedia.QMediaPlayer.MediaStatus
         ].connect(self._media_status_changed)
+        self._video_probe = QtMultimedia.QVideoProbe(self)
+        self._video_probe.videoFrameProbed.connect(self._on_video_frame)
+        self._video_probe.setSource(self._video_player)
 
         self._stacked_widget.addWidget(self._video_widget)
 
-        self._stacked_widget.setCurrentWidget(self._widget)
-
-        self.setFullScreen(self._is_fullscreen)
-
-        QtCore.QMetaObject.connectSlotsByName(self)
-
     def setRemainingMusicTime(self, diff_seconds):
         mp = self._music_player
-        if mp.isAudioAvailable():
+        if mp is not None and mp.isAudioAvailable():
             duration = mp.duration()
             seek_time = duration - diff_seconds * 1000
             if seek_time >= 0:
                 mp.setPosition(seek_time)
+                self._music_offset_ms = int(seek_time)
                 self._config_window._music_duration_lcd.setStyleSheet("color: black")
             else:
                 self._config_window._music_duration_lcd.setStyleSheet("color: red")
 
+    def addOutput(self, screen: QtGui.QScreen) -> "OutputWindow":
+        output = OutputWindow(self, screen)
+        self._outputs.append(output)
+        return output
+
+    def outputs(self) -> List["OutputWindow"]:
+        return list(self._outputs)
+
+    def _remove_output(self, output: "OutputWindow"):
+        if output in self._outputs:
+            self._outputs.remove(output)
+
+    def startAutosave(self, path: Path):
+        if self._autosaver is not None:
+            self._autosaver.stop()
+        self._autosaver = SessionAutosaver(
+            self.sessionState,
+            path,
+            parent=self,
+            playlist_key=self._slidesWidget.playlist_key,
+            playlist=self._slidesWidget.playlist_state,
+        )
+        self._autosaver.start()
+
+    def sessionState(self) -> Dict:
+        return {
+            "config": self._config_window.session_state(),
+            "slideshow": self._slidesWidget.session_state(),
+            "window": {
+                "fullscreen": self._is_fullscreen,
+                "corner": self._timerCorner,
+                "music_offset_ms": self._music_offset_ms,
+            },
+        }
+
+    def restoreSession(self, state: Dict):
+        with metrics.timed("session_restore_ms"):
+            window = state.get("window", {})
+            self.setTimerCorner(window.get("corner", self._timerCorner))
+            # the slides come first, the config then only sets the pause
+            slideshow = dict(state.get("slideshow", {}))
+            slideshow.update(state.get("playlist") or {})
+            self._slidesWidget.restore_session(slideshow)
+            self._config_window.restore_session(state.get("config", {}))
+            if window.get("fullscreen"):
+                self.setFullScreen(True)
+
+    def runSchedule(self, segments: List[Segment]):
+        """Runs the segments one after the other, starting now."""
+        if self._schedule is not None:
+            self._schedule.stop()
+            self._schedule.deleteLater()
+        self._schedule = ScheduleEngine(segments, self, self._clock)
+        self._schedule.segmentPrepare.connect(self._prepare_segment)
+        self._schedule.segmentStarted.connect(self._start_segment)
+        # the countdown ends the program, whichever of the two comes first;
+        # a finished countdown emits nothing more
+        self._schedule.finished.connect(self._timerWidget.stop)
+        self._schedule.start()
+
+    def _prepare_segment(self, index: int):
+        segment = self._schedule.segments()[index]
+        if segment.folder is not None:
+            self._slidesWidget.prepare(segment.folder, segment.recursive)
+
+    def _start_segment(self, index: int, end_time: datetime.datetime):
+        segment = self._schedule.segments()[index]
+        config = self._config_window
+        if index > 0:
+            self._end_segment()
+        # the config window shows the segment and its handlers do the rest,
+        # as if the operator had entered it; only the end time is exact
+        self._segment_end_time = end_time
+        config._end_time_input.setText(end_time.strftime("%H:%M:%S"))
+        config._vid_fn_label.setText(str(segment.video) if segment.video else "")
+        if segment.auto_quit is not None:
+            config._auto_quit_cb.setChecked(segment.auto_quit)
+        self._timerWidget.start(end_time)
+        if segment.folder is not None and (
+            str(segment.folder) != config._dir_label.text()
+            or segment.recursive != config._cb_recursive.isChecked()
+        ):
+            config._dir_label.setText(str(segment.folder))
+            config._cb_recursive.setChecked(segment.recursive)
+            self._slidesWidget.start(segment.folder, segment.recursive)
+        if segment.music is not None:
+            config._music_fn_label.setText(str(segment.music))
+        if config._music_fn_label.text():
+            # playing seeks so that the music ends with the segment
+            self.music_player().stop()
+            config.on_music_play_button_clicked(True)
+
+    def _end_segment(self):
+        # like the end of the countdown, but the show goes on
+        video_file = self._config_window._vid_fn_label.text()
+        if video_file:
+            self._prepare_end_video()
+            self._video_started = True
+            self._stacked_widget.setCurrentWidget(self._video_widget)
+            self._video_player.play()
+        if self._music_player is not None:
+            self._music_player.stop()
+
+    def startSyncLeader(self, group: Optional[str] = None, port: Optional[int] = None):
+        # QtNetwork is only loaded when syncing is used
+        from .sync import DEFAULT_GROUP, DEFAULT_PORT, SyncLeader
+
+        self._stop_sync()
+        self._sync = SyncLeader(
+            self._timerWidget,
+            self._slidesWidget,
+            group or DEFAULT_GROUP,
+            port or DEFAULT_PORT,
+            self,
+            self._clock,
+        )
+
+    def startSyncFollower(
+        self, group: Optional[str] = None, port: Optional[int] = None
+    ):
+        from .sync import DEFAULT_GROUP, DEFAULT_PORT, SyncedClock, SyncFollower
+
+        if not isinstance(self._clock, SyncedClock):
+            raise ValueError("a sync follower needs a window with a SyncedClock")
+        self._stop_sync()
+        self._sync = SyncFollower(
+            self._clock, group or DEFAULT_GROUP, port or DEFAULT_PORT, self
+        )
+        self._sync.endTimeChanged.connect(self._on_leader_end_time)
+        self._sync.slideDue.connect(self._on_slide_due)
+        self._sync.shuffleChanged.connect(self._slidesWidget.set_shuffle)
+        self._sync.leaderLost.connect(lambda: self._slidesWidget.set_autoplay(True))
+
+    def _stop_sync(self):
+        if self._sync is not None:
+            self._sync.stop()
+            self._sync.deleteLater()
+            self._sync = None
+        self._leader_end_time = None
+
+    def _on_leader_end_time(self, end_time: datetime.datetime):
+        self._leader_end_time = end_time
+        self._config_window.on_end_time_changed()
+
+    def fixedEndTime(self) -> Optional[datetime.datetime]:
+        """The end time that entries in the config window cannot change: the
+        sync leader's or the one of the running program segment."""
+        if self._leader_end_time is not None:
+            return self._leader_end_time
+        if self._schedule_running():
+            return self._segment_end_time
+        return None
+
+    def _on_slide_due(self, position: int):
+        # the leader decides when slides change
+        self._slidesWidget.set_autoplay(False)
+        if position < len(self._slidesWidget.playlist()):
+            self._slidesWidget.seek(position)
+
+    def setTimerVisible(self, visible: bool):
+        self._timer_visible = visible
+        if self._compositor is not None and self._compositor.isVisible():
+            self._timerWidget.hide()
+            self._compositor.setTimerVisible(visible)
+        else:
+            self._timerWidget.setVisible(visible)
+        for output in self._outputs:
+            output.setTimerVisible(visible)
+
+    def setCompositorMode(self, enabled: bool):
+        # Paint background, slide and timer in a single widget instead of the
+        # stacked, translucent labels
+        if enabled and self._compositor is None:
+            self._compositor = CompositorView(
+                self._widget, self._slidesWidget._view, self._timerWidget
+            )
+            self._compositor.setGeometry(self._widget.rect())
+        if self._compositor is not None:
+            self._compositor.setVisible(enabled)
+            self._compositor.raise_()
+        self._slidesWidget._view.set_composited(enabled)
+        self.setTimerVisible(self._timer_visible)
+
+    def compositor_frame_stats(self) -> Dict[str, float]:
+        if self._compositor is None:
+            return {}
+        return self._compositor.frame_stats()
+
+    def setDiskCacheBudget(self, budget_bytes: int):
+        if self._disk_cache is not None:
+            self._disk_cache.set_budget(budget_bytes)
+
     def setTimerPaddingX(self, padding):
         self._timerWidget.setPaddingX(padding)
+        for output in self._outputs:
+            output.timer().setPaddingX(padding)
 
     def setTimerPaddingY(self, padding):
         self._timerWidget.setPaddingY(padding)
+        for output in self._outputs:
+            output.timer().setPaddingY(padding)
+
+    def setTimerFontColor(self, color: QtGui.QColor):
+        self._timerWidget.setFontColor(color)
+        for output in self._outputs:
+            output.timer().setFontColor(color)
 
     def set_background_picture(self, filename: Path):
         self._slidesWidget.show()
@@ -283,6 +1370,8 @@ class GalleryCountdownWindow(QtWidgets.QMainWindow):
 
     def setTimerFont(self, font: QtGui.QFont):
         self._timerWidget.setFont(font)
+        for output in self._outputs:
+            output.timer().setFont(font)
 
     def setTimerFontSize(self, size: int):
         self._timerWidget.setFontSize(size)
@@ -292,106 +1381,220 @@ class GalleryCountdownWindow(QtWidgets.QMainWindow):
         size = self.size()
         width = size.width()
         height = size.height()
-        if self._timerWidget is not None:
-            if self._timerCorner == 1:
-                # Place timer in lower left corner
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignLeft
-                    | QtCore.Qt.AlignmentFlag.AlignBottom
-                )
-            elif self._timerCorner == 2:
-                # Place timer in bottom center
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignHCenter
-                    | QtCore.Qt.AlignmentFlag.AlignBottom
-                )
-            elif self._timerCorner == 3:
-                # Place timer in lower right corner
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignRight
-                    | QtCore.Qt.AlignmentFlag.AlignBottom
-                )
-            elif self._timerCorner == 4:
-                # Place timer in left center
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignLeft
-                    | QtCore.Qt.AlignmentFlag.AlignVCenter
-                )
-            elif self._timerCorner == 6:
-                # Place timer in right center
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignRight
-                    | QtCore.Qt.AlignmentFlag.AlignVCenter
-                )
-            elif self._timerCorner == 7:
-                # Place timer in upper left corner
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignTop
-                )
-            elif self._timerCorner == 8:
-                # Place timer in upper center
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignHCenter
-                    | QtCore.Qt.AlignmentFlag.AlignTop
-                )
-            elif self._timerCorner == 9:
-                # Place timer in upper right corner
-                self._timerWidget.setAlignment(
-                    QtCore.Qt.AlignmentFlag.AlignRight
-                    | QtCore.Qt.AlignmentFlag.AlignTop
-                )
-            self._timerWidget.setGeometry(0, 0, width, height)
+        self._place_timer()
 
         # Make slides full screen
         self._slidesWidget.setGeometry(0, 0, width, height)
+        if self._compositor is not None:
+            self._compositor.setGeometry(0, 0, width, height)
 
         # Shortcuts
         lbl_size = self._shortcut_help_label.size()
         self._shortcut_help_label.move(
-            (width - lbl_size.width()) / 2,
-            (height - lbl_size.height()) / 2,
+            (width - lbl_size.width()) // 2,
+            (height - lbl_size.height()) // 2,
         )
 
         # Video
-        self._video_widget.setGeometry(0, 0, width, height)
+        if self._video_widget is not None:
+            self._video_widget.setGeometry(0, 0, width, height)
+
+    def _place_timer(self):
+        # The timer only covers the box of its digits, so a tick repaints that
+        # box instead of the whole window
+        if self._timerWidget is None:
+            return
+        self._timerWidget.setAlignment(CORNER_ALIGNMENTS[self._timerCorner])
+        self._timerWidget.setGeometry(
+            timer_rect(self._timerCorner, self._timerWidget.sizeHint(), self.rect())
+        )
+        if self._compositor is not None and self._compositor.isVisible():
+            self._compositor.update()
+
+    def setVideoLeadTime(self, seconds: int):
+        self._video_lead_s = max(0, seconds)
+
+    def _on_timer_ticked(self, remaining_s: int):
+        if remaining_s <= self._video_lead_s:
+            self._prepare_end_video()
+
+    def _prepare_end_video(self):
+        # Open the end video ahead of time and hold it on its first frame, so
+        # the switch at zero does not wait for the backend to open and buffer
+        video_file = self._config_window._vid_fn_label.text()
+        if not video_file or video_file == self._prepared_video:
+            return
+        from PyQt5 import QtMultimedia
+
+        self._prepared_video = video_file
+        video_player = self.video_player()
+        video_player.setMedia(
+            QtMultimedia.QMediaContent(QtCore.QUrl.fromLocalFile(video_file))
+        )
+        video_player.pause()
+        metrics.event("video.prepared", video_file)
+
+    def _on_video_frame(self, frame):
+        # the first frame after the countdown ended completes the handoff
+        if self._handoff_started is None:
+            return
+        handoff_ms = 1000 * (time.perf_counter() - self._handoff_started)
+        self._handoff_started = None
+        metrics.record("video.handoff_ms", handoff_ms)
+        logger.info("end video shown %.0f ms after the countdown", handoff_ms)
 
     def _media_status_changed(self, status):
-        print(status)
+        metrics.event("video.media_status", int(status))
 
     def _on_video_state_changed(self, state):
-        print(state)
+        from PyQt5 import QtMultimedia
+
+        metrics.event("video.state", int(state))
+        if (
+            state == QtMultimedia.QMediaPlayer.State.PlayingState
+            and self._handoff_started is not None
+        ):
+            play_ms = 1000 * (time.perf_counter() - self._handoff_started)
+            metrics.record("video.play_ms", play_ms)
         if state == QtMultimedia.QMediaPlayer.State.StoppedState:
-            if self._auto_quit:
+            if self._video_started and self._schedule_running():
+                # the video ended a segment, back to the next one
+                self._video_started = False
+                self._prepared_video = None
+                self._stacked_widget.setCurrentWidget(self._widget)
+            # stopping a video that is only prepared must not end the show
+            elif self._video_started and self._auto_quit:
                 self.close()
 
+    def _schedule_running(self) -> bool:
+        return self._schedule is not None and self._schedule.is_running()
+
     def _on_timer_finished(self):
-        self._slidesWidget.stop()
-        self._music_player.stop()
+        if self._schedule_running():
+            # the schedule ends segments, this is the countdown of one
+            return
+        self._handoff_started = time.perf_counter()
         video_file = self._config_window._vid_fn_label.text()
         if video_file:
+            self._prepare_end_video()
+            self._video_started = True
             self._stacked_widget.setCurrentWidget(self._video_widget)
-            self._video_player.setMedia(
-                QtMultimedia.QMediaContent(QtCore.QUrl.fromLocalFile(video_file))
-            )
             self._video_player.play()
-        else:
+        self._slidesWidget.stop()
+        if self._music_player is not None:
+            self._music_player.stop()
+        if not video_file:
             # no video, check if auto quit
             if self._auto_quit:
                 self.close()
 
     def closeEvent(self, event):
         if self._timerWidget is not None:
-            self._timerWidget._active = False
+            self._timerWidget.cancel()
+        if self._autosaver is not None:
+            self._autosaver.stop()
+            self._autosaver = None
+        self._stop_sync()
+        for output in list(self._outputs):
+            output.close()
         self._config_window.close()
         event.accept()
 
 
+class OutputWindow(QtWidgets.QWidget):
+    """The slides and countdown of a gallery on another screen.
+
+    Its view gets the slides of the gallery's Slideshow, which decodes each
+    slide once for all screens, and shares the cache of scaled copies. Its
+    timer only displays what the gallery's CountdownTimer counts. Size, timer
+    corner and slide paddings are its own.
+    """
+
+    def __init__(self, gallery: GalleryCountdownWindow, screen: QtGui.QScreen):
+        super().__init__()
+        self._gallery = gallery
+        self._timerCorner = 3
+        self.setWindowTitle(f"Countdown Galerie ({screen.name()})")
+        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setStyleSheet("background-color: black")
+
+        slideshow = gallery._slidesWidget
+        self._view = PixmapView(self, slideshow._view.scaled_cache())
+        self._view.setSlideShowPaddings(list(slideshow._view._slideshow_paddings))
+
+        main_timer = gallery._timerWidget
+        self._timerWidget = CountdownTimer(self)
+        self._timerWidget.setFont(main_timer.font())
+        self._timerWidget.setFontColor(main_timer._color)
+        self._timerWidget.setPaddingX(main_timer._padding_x)
+        self._timerWidget.setPaddingY(main_timer._padding_y)
+        self._timerWidget.setVisible(gallery._timer_visible)
+        self._timerWidget.setText(main_timer.text())
+        self._timerWidget.geometryHintChanged.connect(self._place_timer)
+        main_timer.ticked.connect(self._on_ticked)
+        main_timer.finished.connect(self._on_finished)
+
+        self.setGeometry(screen.geometry())
+        self.showFullScreen()
+        # after show(), a window may be moved before it is mapped
+        self.windowHandle().setScreen(screen)
+        slideshow.add_view(self._view)
+
+    def timer(self) -> CountdownTimer:
+        return self._timerWidget
+
+    def view(self) -> PixmapView:
+        return self._view
+
+    def setTimerCorner(self, corner: int):
+        self._timerCorner = corner
+        self._place_timer()
+
+    def setTimerVisible(self, visible: bool):
+        self._timerWidget.setVisible(visible)
+
+    def setSlideShowPaddings(self, paddings):
+        self._view.setSlideShowPaddings(paddings)
+
+    def _on_ticked(self, remaining_s: int):
+        self._timerWidget.setText(format_remaining(remaining_s))
+
+    def _on_finished(self):
+        self._timerWidget.setText("")
+
+    def _place_timer(self):
+        self._timerWidget.setAlignment(CORNER_ALIGNMENTS[self._timerCorner])
+        self._timerWidget.setGeometry(
+            timer_rect(self._timerCorner, self._timerWidget.sizeHint(), self.rect())
+        )
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        if key == QtCore.Qt.Key_Q:
+            self._gallery.close()
+        elif key == QtCore.Qt.Key_F:
+            self.showFullScreen()
+        elif key == QtCore.Qt.Key_Escape:
+            self.showNormal()
+        elif QtCore.Qt.Key_1 <= key <= QtCore.Qt.Key_9 and key != QtCore.Qt.Key_5:
+            self.setTimerCorner(key - QtCore.Qt.Key_0)
+
+    def resizeEvent(self, event=None):
+        self._view.setGeometry(self.rect())
+        self._place_timer()
+
+    def closeEvent(self, event):
+        self._gallery._slidesWidget.remove_view(self._view)
+        self._gallery._remove_output(self)
+        event.accept()
+
+
 class GalleryConfigWindow(QtWidgets.QWidget):
     def __init__(self, gallery_window: GalleryCountdownWindow):
         super().__init__()
         self._gallery_window = gallery_window
         self._timer_color = QtGui.QColor("white")
-        uic.loadUi(resource_path("config.ui"), self)
+        load_config_ui(self)
         self._init_ui()
 
         # initialize app with config dialog values
@@ -404,6 +1607,7 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         self.on_padding_x_value_changed()
         self.on_padding_y_value_changed()
         self.on_slideshow_padding_changed()
+        self.on_vid_lead_changed()
 
         self.show()
 
@@ -435,18 +1639,7 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         )
         self._music_fn_button.clicked.connect(self.on_music_fn_button_clicked)
         self._music_play_button.clicked.connect(self.on_music_play_button_clicked)
-        self._gallery_window._music_player.durationChanged.connect(
-            self._music_duration_slider.setMaximum
-        )
-        self._gallery_window._music_player.positionChanged.connect(
-            self._music_duration_slider.setValue
-        )
-        self._gallery_window._music_player.positionChanged.connect(
-            self.on_music_position_changed
-        )
-        self._gallery_window._music_player.stateChanged.connect(
-            self.on_music_player_state_changed
-        )
+        self._gallery_window.musicPlayerCreated.connect(self.on_music_player_created)
 
         self._bg_fn_button.setIcon(
             QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_FileIcon),
@@ -468,6 +1661,7 @@ class GalleryConfigWindow(QtWidgets.QWidget):
             QtWidgets.QApplication.style().standardIcon(QtWidgets.QStyle.SP_FileIcon),
         )
         self._vid_fn_button.clicked.connect(self.on_vid_fn_button_clicked)
+        self._vid_lead_input.valueChanged.connect(self.on_vid_lead_changed)
 
         self._but_fullscreen.clicked.connect(
             lambda: self._gallery_window.setFullScreen(True)
@@ -477,15 +1671,98 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         self._cb_show_slides_frame.stateChanged.connect(
             self.on_show_slides_frame_cb_changed
         )
+        self._cb_compositor.stateChanged.connect(self.on_compositor_cb_changed)
+        self._transition_input.currentIndexChanged.connect(self.on_transition_changed)
+
+    def session_state(self) -> Dict:
+        return {
+            "end_time": self._end_time_input.text(),
+            "pause": self._pause_input.text(),
+            "font": self._font_select.currentText(),
+            "font_size": self._font_size_input.text(),
+            "font_color": self._timer_color.name(),
+            "timer_visible": self._visible_timer_cb.isChecked(),
+            "padding_x": self._padding_x_slider.value(),
+            "padding_y": self._padding_y_slider.value(),
+            "slideshow_paddings": self._slideshow_paddings.text(),
+            "show_slides_frame": self._cb_show_slides_frame.isChecked(),
+            "compositor": self._cb_compositor.isChecked(),
+            "transition": self._transition_input.currentIndex(),
+            "auto_quit": self._auto_quit_cb.isChecked(),
+            "folder": self._dir_label.text(),
+            "recursive": self._cb_recursive.isChecked(),
+            "background": self._bg_fn_label.text(),
+            "music": self._music_fn_label.text(),
+            "music_playing": self._music_play_button.isChecked(),
+            "video": self._vid_fn_label.text(),
+            "video_lead": self._vid_lead_input.value(),
+        }
+
+    def restore_session(self, state: Dict):
+        # the widgets are set as if the operator had entered the values,
+        # then the same handlers run as for the defaults in __init__
+        texts = {
+            "end_time": self._end_time_input,
+            "pause": self._pause_input,
+            "font_size": self._font_size_input,
+            "slideshow_paddings": self._slideshow_paddings,
+            "folder": self._dir_label,
+            "background": self._bg_fn_label,
+            "music": self._music_fn_label,
+            "video": self._vid_fn_label,
+        }
+        for key, widget in texts.items():
+            if key in state:
+                widget.setText(state[key])
+        checks = {
+            "timer_visible": self._visible_timer_cb,
+            "show_slides_frame": self._cb_show_slides_frame,
+            "compositor": self._cb_compositor,
+            "auto_quit": self._auto_quit_cb,
+            "recursive": self._cb_recursive,
+        }
+        for key, widget in checks.items():
+            if key in state:
+                widget.setChecked(state[key])
+        if "font" in state:
+            self._font_select.setCurrentText(state["font"])
+        if "font_color" in state:
+            self._timer_color = QtGui.QColor(state["font_color"])
+            self._font_color_button.setStyleSheet(
+                f"background-color: {self._timer_color.name()}"
+            )
+            self._gallery_window.setTimerFontColor(self._timer_color)
+        if "transition" in state:
+            self._transition_input.setCurrentIndex(state["transition"])
+        self._padding_x_slider.setValue(state.get("padding_x", 20))
+        self._padding_y_slider.setValue(state.get("padding_y", 20))
+        self._vid_lead_input.setValue(state.get("video_lead", 10))
+        self.on_end_time_changed()
+        self.on_pause_changed()
+        self.on_font_changed()
+        self.on_slideshow_padding_changed()
+        if self._bg_fn_label.text():
+            self._gallery_window.set_background_picture(Path(self._bg_fn_label.text()))
+        if self._vid_fn_label.text():
+            self._gallery_window.video_player()
+        if state.get("music_playing") and self._music_fn_label.text():
+            # playing moves the music so it ends with the countdown, the
+            # same offset setRemainingMusicTime found before
+            self.on_music_play_button_clicked(True)
 
     def on_auto_quit_cb_changed(self):
         self._gallery_window._auto_quit = self._auto_quit_cb.isChecked()
 
     def on_timer_visible_cb_changed(self):
-        if self._visible_timer_cb.isChecked():
-            self._gallery_window._timerWidget.show()
-        else:
-            self._gallery_window._timerWidget.hide()
+        self._gallery_window.setTimerVisible(self._visible_timer_cb.isChecked())
+
+    def on_compositor_cb_changed(self):
+        self._gallery_window.setCompositorMode(self._cb_compositor.isChecked())
+
+    def on_transition_changed(self):
+        # the entries are in the order of TRANSITIONS
+        kind = TRANSITIONS[self._transition_input.currentIndex()]
+        self._gallery_window._slidesWidget.set_transition(kind)
 
     def on_show_slides_frame_cb_changed(self):
         if self._cb_show_slides_frame.isChecked():
@@ -497,26 +1774,40 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         (choice, _) = QtWidgets.QFileDialog.getOpenFileName(parent=self)
         if choice:
             self._vid_fn_label.setText(choice)
+            self._gallery_window.video_player()
+
+    def on_vid_lead_changed(self):
+        self._gallery_window.setVideoLeadTime(self._vid_lead_input.value())
 
     def on_music_fn_button_clicked(self):
         (choice, _) = QtWidgets.QFileDialog.getOpenFileName(parent=self)
         if choice:
             self._music_fn_label.setText(choice)
+            self._gallery_window.music_player()
+
+    def on_music_player_created(self, player):
+        player.durationChanged.connect(self._music_duration_slider.setMaximum)
+        player.positionChanged.connect(self._music_duration_slider.setValue)
+        player.positionChanged.connect(self.on_music_position_changed)
+        player.stateChanged.connect(self.on_music_player_state_changed)
 
     def on_music_play_button_clicked(self, checked):
-        if (
-            self._gallery_window._music_player.state()
-            == QtMultimedia.QMediaPlayer.State.StoppedState
-        ):
+        from PyQt5 import QtMultimedia
+
+        player = self._gallery_window.music_player()
+        if player.state() == QtMultimedia.QMediaPlayer.State.StoppedState:
             music_file = Path(self._music_fn_label.text())
-            self._gallery_window._music_player.setMedia(
+            player.setMedia(
                 QtMultimedia.QMediaContent(QtCore.QUrl.fromLocalFile(str(music_file)))
             )
-            self._gallery_window._music_player.play()
+            player.play()
         else:
-            self._gallery_window._music_player.stop()
+            player.stop()
 
     def on_music_player_state_changed(self, newstate):
+        from PyQt5 import QtMultimedia
+
+        metrics.event("music.state", int(newstate))
         if newstate == QtMultimedia.QMediaPlayer.State.PlayingState:
             QtCore.QTimer.singleShot(100, self.on_end_time_changed)
             self._music_play_button.setChecked(True)
@@ -524,7 +1815,7 @@ class GalleryConfigWindow(QtWidgets.QWidget):
             self._music_play_button.setChecked(False)
 
     def on_music_position_changed(self, position):
-        duration = self._gallery_window._music_player.duration()
+        duration = self._gallery_window.music_player().duration()
         remaining = QtCore.QTime(0, 0, 0).addSecs((duration - position) / 1000)
         self._music_duration_lcd.display(remaining.toString("mm:ss"))
 
@@ -562,7 +1853,7 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         self._font_color_button.setStyleSheet(
             f"background-color: {self._timer_color.name()}"
         )
-        self._gallery_window._timerWidget.setFontColor(self._timer_color)
+        self._gallery_window.setTimerFontColor(self._timer_color)
 
     def on_dir_button_clicked(self):
         choice = QtWidgets.QFileDialog.getExistingDirectory(parent=self)
@@ -570,7 +1861,9 @@ class GalleryConfigWindow(QtWidgets.QWidget):
             folder = Path(choice)
             self._dir_label.setText(choice)
             self.on_pause_changed()
-            self._gallery_window._slidesWidget.start(folder)
+            self._gallery_window._slidesWidget.start(
+                folder, self._cb_recursive.isChecked()
+            )
             self._gallery_window._slidesWidget.show()
 
     def on_slideshow_padding_changed(self):
@@ -583,17 +1876,28 @@ class GalleryConfigWindow(QtWidgets.QWidget):
         self._gallery_window._slidesWidget._view.setSlideShowPaddings(padding_values)
 
     def on_end_time_changed(self):
+        window = self._gallery_window
+        end_time = window.fixedEndTime()
+        if end_time is not None:
+            # the field shows it again instead of what was entered
+            self._end_time_input.setText(end_time.strftime("%H:%M:%S"))
+            window.setRemainingMusicTime(
+                (end_time - window._clock.now()).total_seconds()
+            )
+            window._timerWidget.start(end_time)
+            return
         text = self._end_time_input.text()
         try:
+            # on the countdown's clock, which may be simulated or synced
+            current_time = window._clock.now()
             end_time = datetime.datetime.combine(
-                datetime.datetime.today(), datetime.time.fromisoformat(text)
+                current_time.date(), datetime.time.fromisoformat(text)
             )
-            current_time = datetime.datetime.now()
-            diff_seconds = (end_time - current_time).total_seconds()
-            if diff_seconds < 0:
+            if end_time < current_time:
                 end_time = end_time + datetime.timedelta(days=1)
-            self._gallery_window.setRemainingMusicTime(diff_seconds)
-            self._gallery_window._timerWidget.start(end_time)
+            diff_seconds = (end_time - current_time).total_seconds()
+            window.setRemainingMusicTime(diff_seconds)
+            window._timerWidget.start(end_time)
         except ValueError:
             self._end_time_input.setText("10:00:00")
 
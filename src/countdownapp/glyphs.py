@@ -0,0 +1,127 @@
+import math
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from PyQt5 import QtCore, QtGui
+
+DIGITS = "0123456789"
+GLYPHS = DIGITS + ":"
+MAX_ATLASES = 8
+
+
+class GlyphAtlas:
+    """The countdown characters pre-rendered into one transparent image.
+
+    Every glyph owns a cell of the line height which is padded on both sides,
+    so glyphs overhanging their advance are not cut off. Drawing text is a
+    series of image blits; characters missing in the atlas fall back to
+    regular text drawing.
+    """
+
+    def __init__(
+        self, font: QtGui.QFont, color: QtGui.QColor, device_pixel_ratio: float = 1.0
+    ):
+        self._font = QtGui.QFont(font)
+        self._color = QtGui.QColor(color)
+        metrics = QtGui.QFontMetrics(font)
+        self._height = metrics.height()
+        self._ascent = metrics.ascent()
+        self._advances = {ch: metrics.horizontalAdvance(ch) for ch in GLYPHS}
+        self._pad = max(
+            [1]
+            + [-metrics.leftBearing(ch) for ch in GLYPHS]
+            + [-metrics.rightBearing(ch) for ch in GLYPHS]
+        )
+        self._dpr = device_pixel_ratio
+        self._cells = {}
+        width = sum(self._advances.values()) + 2 * self._pad * len(GLYPHS)
+        self._image = QtGui.QImage(
+            math.ceil(width * self._dpr),
+            math.ceil(self._height * self._dpr),
+            QtGui.QImage.Format_ARGB32_Premultiplied,
+        )
+        self._image.setDevicePixelRatio(self._dpr)
+        self._image.fill(QtCore.Qt.GlobalColor.transparent)
+        painter = QtGui.QPainter(self._image)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.TextAntialiasing)
+        painter.setFont(self._font)
+        painter.setPen(self._color)
+        x = 0
+        for ch in GLYPHS:
+            cell_width = self._advances[ch] + 2 * self._pad
+            painter.drawText(QtCore.QPointF(x + self._pad, self._ascent), ch)
+            self._cells[ch] = QtCore.QRectF(
+                x * self._dpr, 0, cell_width * self._dpr, self._height * self._dpr
+            )
+            x += cell_width
+        painter.end()
+
+    def image(self) -> QtGui.QImage:
+        return self._image
+
+    def padding(self) -> int:
+        return self._pad
+
+    def advance(self, ch: str) -> int:
+        advance = self._advances.get(ch)
+        if advance is None:
+            advance = QtGui.QFontMetrics(self._font).horizontalAdvance(ch)
+        return advance
+
+    def size(self, text: str) -> QtCore.QSize:
+        return QtCore.QSize(sum(self.advance(ch) for ch in text), self._height)
+
+    def layout(self, text: str, origin: QtCore.QPoint) -> List[QtCore.QRect]:
+        """Rectangles covered by each character when drawn at origin."""
+        rects = []
+        x = origin.x()
+        for ch in text:
+            advance = self.advance(ch)
+            rects.append(
+                QtCore.QRect(
+                    x - self._pad, origin.y(), advance + 2 * self._pad, self._height
+                )
+            )
+            x += advance
+        return rects
+
+    def draw(
+        self,
+        painter: QtGui.QPainter,
+        origin: QtCore.QPoint,
+        text: str,
+        clip: Optional[QtCore.QRect] = None,
+    ):
+        for ch, rect in zip(text, self.layout(text, origin)):
+            if clip is not None and not clip.intersects(rect):
+                continue
+            cell = self._cells.get(ch)
+            if cell is not None:
+                painter.drawImage(QtCore.QRectF(rect), self._image, cell)
+            else:
+                painter.save()
+                painter.setFont(self._font)
+                painter.setPen(self._color)
+                painter.drawText(
+                    QtCore.QPointF(rect.x() + self._pad, rect.y() + self._ascent), ch
+                )
+                painter.restore()
+
+
+_atlases: "OrderedDict[Tuple, GlyphAtlas]" = OrderedDict()
+
+
+def atlas_for(
+    font: QtGui.QFont, color: QtGui.QColor, device_pixel_ratio: float = 1.0
+) -> GlyphAtlas:
+    # atlases are shared between all timers using the same font and color
+    key = (font.key(), color.rgba(), device_pixel_ratio)
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, color, device_pixel_ratio)
+        _atlases[key] = atlas
+        while len(_atlases) > MAX_ATLASES:
+            _atlases.popitem(last=False)
+    else:
+        _atlases.move_to_end(key)
+    return atlas
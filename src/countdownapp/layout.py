@@ -0,0 +1,38 @@
+from typing import Sequence
+
+from PyQt5 import QtCore, QtWidgets
+
+Alignment = QtCore.Qt.AlignmentFlag
+CORNER_ALIGNMENTS = {
+    # lower left corner, bottom center, lower right corner
+    1: Alignment.AlignLeft | Alignment.AlignBottom,
+    2: Alignment.AlignHCenter | Alignment.AlignBottom,
+    3: Alignment.AlignRight | Alignment.AlignBottom,
+    # left center, right center
+    4: Alignment.AlignLeft | Alignment.AlignVCenter,
+    6: Alignment.AlignRight | Alignment.AlignVCenter,
+    # upper left corner, upper center, upper right corner
+    7: Alignment.AlignLeft | Alignment.AlignTop,
+    8: Alignment.AlignHCenter | Alignment.AlignTop,
+    9: Alignment.AlignRight | Alignment.AlignTop,
+}
+
+
+def slide_rect(size: QtCore.QSize, paddings: Sequence[int]) -> QtCore.QRect:
+    # paddings are percentages of the view size: top, right, bottom, left
+    w = size.width()
+    h = size.height()
+    top = int(paddings[0] / 100 * h)
+    right = int(paddings[1] / 100 * w)
+    bottom = int(paddings[2] / 100 * h)
+    left = int(paddings[3] / 100 * w)
+    return QtCore.QRect(
+        left, top, max(0, w - (left + right)), max(0, h - (top + bottom))
+    )
+
+
+def timer_rect(corner: int, size: QtCore.QSize, outer: QtCore.QRect) -> QtCore.QRect:
+    # corners are numbered like the keys of a numeric keypad
+    return QtWidgets.QStyle.alignedRect(
+        QtCore.Qt.LayoutDirection.LeftToRight, CORNER_ALIGNMENTS[corner], size, outer
+    )
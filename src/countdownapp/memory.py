@@ -0,0 +1,130 @@
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from . import metrics
+
+DEFAULT_MEMORY_BUDGET_BYTES = 384 * 1024 * 1024
+# eviction order, cheapest to recreate first: originals are decoded again
+# from their file, scaled copies are scaled again from what is left, and
+# prefetched images are the slides about to be shown
+KINDS = ("original", "scaled", "prefetched")
+
+
+class MemoryGovernor:
+    """Keeps the pixels held by the package within one budget.
+
+    Owners (caches, views, the prefetcher) report every image they keep with
+    track() and forget it with untrack(). When the total exceeds the budget
+    the least valuable entries are handed back to their owners through
+    ``owner.release_memory(key)``, originals first and within a kind the
+    least recently used. Owners may refuse, e.g. for what is on screen, by
+    returning False. Owners are referenced weakly. GUI thread only.
+    """
+
+    def __init__(self, budget_bytes: int = DEFAULT_MEMORY_BUDGET_BYTES):
+        self._budget = budget_bytes
+        # (owner id, key) -> (kind, bytes), least recently used first
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[str, int]]" = (
+            OrderedDict()
+        )
+        self._owners: Dict[int, weakref.ref] = {}
+        self._bytes = 0
+        self._evicting = False
+        self.evictions = 0
+        self.refusals = 0
+
+    def budget(self) -> int:
+        return self._budget
+
+    def set_budget(self, budget_bytes: int):
+        self._budget = max(0, budget_bytes)
+        self._evict()
+
+    def track(self, owner: object, key: Hashable, nbytes: int, kind: str):
+        owner_id = id(owner)
+        if owner_id not in self._owners:
+            self._owners[owner_id] = weakref.ref(
+                owner, lambda _, owner_id=owner_id: self._forget_owner(owner_id)
+            )
+        old = self._entries.pop((owner_id, key), None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[(owner_id, key)] = (kind, nbytes)
+        self._bytes += nbytes
+        self._evict()
+
+    def touch(self, owner: object, key: Hashable):
+        entry = (id(owner), key)
+        if entry in self._entries:
+            self._entries.move_to_end(entry)
+
+    def untrack(self, owner: object, key: Hashable):
+        old = self._entries.pop((id(owner), key), None)
+        if old is not None:
+            self._bytes -= old[1]
+
+    def untrack_all(self, owner: object):
+        self._forget_owner(id(owner))
+
+    def _forget_owner(self, owner_id: int):
+        self._owners.pop(owner_id, None)
+        for entry in [e for e in self._entries if e[0] == owner_id]:
+            self._bytes -= self._entries.pop(entry)[1]
+
+    def _evict(self):
+        if self._evicting or self._bytes <= self._budget:
+            return
+        self._evicting = True
+        try:
+            for kind in KINDS:
+                for entry, (entry_kind, nbytes) in list(self._entries.items()):
+                    if self._bytes <= self._budget:
+                        return
+                    if entry_kind != kind or entry not in self._entries:
+                        continue
+                    owner_id, key = entry
+                    owner = self._owners[owner_id]()
+                    if owner is None:
+                        self._forget_owner(owner_id)
+                        continue
+                    if owner.release_memory(key):
+                        self.untrack(owner, key)
+                        self.evictions += 1
+                        metrics.count("memory_evictions")
+                    else:
+                        self.refusals += 1
+        finally:
+            self._evicting = False
+
+    def usage(self) -> Dict[str, int]:
+        usage = dict.fromkeys(KINDS, 0)
+        # list() copies in one step, metrics may ask from another thread
+        for kind, nbytes in list(self._entries.values()):
+            usage[kind] = usage.get(kind, 0) + nbytes
+        return usage
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.usage()
+        stats.update(
+            {
+                "bytes": self._bytes,
+                "budget": self._budget,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "refusals": self.refusals,
+            }
+        )
+        return stats
+
+
+_governor: Optional[MemoryGovernor] = None
+
+
+def governor() -> MemoryGovernor:
+    """The governor shared by everything in the process."""
+    global _governor
+    if _governor is None:
+        _governor = MemoryGovernor()
+        metrics.register_gauge("memory", _governor.stats)
+    return _governor
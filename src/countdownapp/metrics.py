@@ -0,0 +1,217 @@
+"""Opt-in instrumentation of the slideshow and timer hot paths.
+
+Measurements go into small ring buffers and are only kept after enable() was
+called; until then every recording function returns right away. A snapshot
+of all series, counters and gauges can be served as JSON on localhost and/or
+written to the log periodically.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+HISTORY = 512
+
+_enabled = False
+_series: Dict[str, Deque[float]] = {}
+_counters: Dict[str, int] = {}
+_events: Deque[Tuple[float, str, Any]] = deque(maxlen=HISTORY)
+_gauges: Dict[str, Callable[[], Any]] = {}
+_lock = threading.Lock()
+_started = time.monotonic()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def record(name: str, value: float):
+    if not _enabled:
+        return
+    series = _series.get(name)
+    if series is None:
+        with _lock:
+            series = _series.setdefault(name, deque(maxlen=HISTORY))
+    series.append(value)
+
+
+@contextmanager
+def timed(name: str):
+    # records the duration of the block in milliseconds
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, 1000 * (time.perf_counter() - start))
+
+
+def count(name: str, increment: int = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + increment
+
+
+def event(name: str, value: Any = None):
+    # state transitions and other rare occurrences
+    if not _enabled:
+        return
+    _events.append((time.monotonic() - _started, name, value))
+    logger.debug("%s: %s", name, value)
+
+
+def register_gauge(name: str, getter: Callable[[], Any]):
+    # gauges are only read when a snapshot is taken
+    _gauges[name] = getter
+
+
+def process_rss_bytes() -> Optional[int]:
+    if sys.platform.startswith("linux"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        ):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # only the peak is available here, in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+register_gauge("process_rss_bytes", process_rss_bytes)
+
+
+def _summarize(values) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "last": values[-1],
+        "mean": sum(ordered) / len(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max": ordered[-1],
+    }
+
+
+def snapshot() -> Dict[str, Any]:
+    gauges = {}
+    for name, getter in list(_gauges.items()):
+        try:
+            gauges[name] = getter()
+        except Exception as e:
+            gauges[name] = f"error: {e}"
+    with _lock:
+        counters = dict(_counters)
+    return {
+        "enabled": _enabled,
+        "uptime_s": time.monotonic() - _started,
+        "series": {name: _summarize(list(v)) for name, v in list(_series.items())},
+        "counters": counters,
+        "gauges": gauges,
+        "events": [
+            {"t": t, "name": name, "value": value} for t, name, value in list(_events)
+        ],
+    }
+
+
+def serve(port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """Serve snapshot() as JSON on http://host:port/metrics."""
+    # imported here, it is not worth its startup time when metrics are off
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(snapshot(), default=str).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    enable()
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    logger.info("metrics served on http://%s:%d/metrics", host, server.server_port)
+    return server
+
+
+def log_periodically(interval_s: float) -> threading.Event:
+    """Log a one line summary every interval; set the returned event to stop."""
+    enable()
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval_s):
+            logger.info("metrics %s", summary_line())
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return stop
+
+
+def summary_line() -> str:
+    parts = []
+    for name, values in sorted(list(_series.items())):
+        summary = _summarize(list(values))
+        if summary["count"]:
+            parts.append(f"{name}={summary['mean']:.1f}/{summary['max']:.1f}")
+    with _lock:
+        counters = sorted(_counters.items())
+    for name, value in counters:
+        parts.append(f"{name}={value}")
+    rss = process_rss_bytes()
+    if rss is not None:
+        parts.append(f"rss_mb={rss / 2**20:.0f}")
+    return " ".join(parts)
@@ -0,0 +1,289 @@
+import array
+import bisect
+import os
+import random
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+_ROUNDS = 4
+
+
+def _mix(value: int, key: int) -> int:
+    # small integer hash, stable across runs unlike hash()
+    x = (value ^ key) & 0xFFFFFFFF
+    x = ((x >> 16) ^ x) * 0x45D9F3B & 0xFFFFFFFF
+    x = ((x >> 16) ^ x) * 0x45D9F3B & 0xFFFFFFFF
+    return (x >> 16) ^ x
+
+
+class Playlist:
+    """Compact, indexable list of image paths.
+
+    All paths live encoded in one byte buffer with an array of offsets into it,
+    so a folder with tens of thousands of images costs a few bytes per entry
+    instead of one Path object each. Playback order is either the storage
+    order or a seeded pseudo random permutation of it which is computed on the
+    fly, so shuffling never copies the entries.
+    """
+
+    def __init__(self, paths: Iterable[Path] = ()):
+        self._buffer = bytearray()
+        self._offsets = array.array("Q", [0])
+        self._position = 0
+        self._shuffle_seed: Optional[int] = None
+        self._keys: List[int] = []
+        self._revision = 0
+        self.extend(paths)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> Path:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("playlist index out of range")
+        start = self._offsets[index]
+        end = self._offsets[index + 1]
+        return Path(os.fsdecode(bytes(self._buffer[start:end])))
+
+    def __iter__(self) -> Iterator[Path]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def copy(self) -> "Playlist":
+        """The entries in storage order, e.g. to be read on another thread."""
+        other = Playlist()
+        other._buffer = bytearray(self._buffer)
+        other._offsets = array.array("Q", self._offsets)
+        return other
+
+    def revision(self) -> int:
+        """Changes whenever entries are added, removed or reordered."""
+        return self._revision
+
+    def names(self) -> List[str]:
+        """All entries in storage order, as strings instead of Paths."""
+        names = []
+        start = 0
+        for end in self._offsets[1:]:
+            names.append(os.fsdecode(bytes(self._buffer[start:end])))
+            start = end
+        return names
+
+    def extend(self, paths: Iterable[Path]):
+        current = self._current_index()
+        for path in paths:
+            self._buffer += os.fsencode(str(path))
+            self._offsets.append(len(self._buffer))
+        self._revision += 1
+        self._keep_current(current)
+
+    def replace(self, paths: Iterable[Path]):
+        current = self.current()
+        self.clear()
+        self.extend(paths)
+        index = None if current is None else self.index_of(current)
+        self._keep_current(index)
+
+    def insert(self, index: int, paths: Iterable[Path]):
+        encoded = [os.fsencode(str(path)) for path in paths]
+        if not encoded:
+            return
+        current = self._current_index()
+        start = self._offsets[index]
+        added = array.array("Q")
+        end = start
+        for item in encoded:
+            end += len(item)
+            added.append(end)
+        shift = end - start
+        self._buffer[start:start] = b"".join(encoded)
+        after = index + 1
+        tail = array.array("Q", (o + shift for o in self._offsets[after:]))
+        del self._offsets[after:]
+        self._offsets.extend(added)
+        self._offsets.extend(tail)
+        self._revision += 1
+        if current is not None and current >= index:
+            current += len(encoded)
+        self._keep_current(current)
+
+    def insert_sorted(self, paths: Iterable[Path]):
+        # keeps a sorted playlist sorted; all paths are merged in with one
+        # pass over buffer and offsets
+        paths = sorted(Path(p) for p in paths)
+        if not paths:
+            return
+        indices = [self.bisect(path) for path in paths]
+        current = self._current_index()
+        buffer = bytearray()
+        offsets = array.array("Q", [0])
+        copied = 0
+        for path, index in zip(paths + [None], indices + [len(self)]):
+            # the old entries before index, moved by what was inserted so far
+            start = self._offsets[copied]
+            end = self._offsets[index]
+            shift = len(buffer) - start
+            buffer += self._buffer[start:end]
+            offsets.extend(
+                self._offsets[i] + shift for i in range(copied + 1, index + 1)
+            )
+            copied = index
+            if path is not None:
+                buffer += os.fsencode(str(path))
+                offsets.append(len(buffer))
+        self._buffer = buffer
+        self._offsets = offsets
+        self._revision += 1
+        if current is not None:
+            current += bisect.bisect_right(indices, current)
+        self._keep_current(current)
+
+    def bisect(self, path: Path) -> int:
+        """Index to insert path at, if the entries are sorted."""
+        low = 0
+        high = len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle] < path:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def remove(self, paths: Iterable[Path]) -> int:
+        removed = {os.fsencode(str(path)) for path in paths}
+        keep = []
+        for index in range(len(self)):
+            start = self._offsets[index]
+            end = self._offsets[index + 1]
+            if bytes(self._buffer[start:end]) not in removed:
+                keep.append(index)
+        count = len(self) - len(keep)
+        if not count:
+            return 0
+        current = self._current_index()
+        self._rebuild(keep)
+        if current is not None and len(self):
+            # a removed current entry hands over to the one stored before it,
+            # so next() goes on with its follower
+            current = (bisect.bisect_right(keep, current) - 1) % len(self)
+        else:
+            current = None
+        self._keep_current(current)
+        return count
+
+    def index_of(self, path: Path) -> Optional[int]:
+        encoded = os.fsencode(str(path))
+        for index in range(len(self)):
+            start = self._offsets[index]
+            end = self._offsets[index + 1]
+            if self._buffer[start:end] == encoded:
+                return index
+        return None
+
+    def clear(self):
+        self._buffer = bytearray()
+        self._offsets = array.array("Q", [0])
+        self._position = 0
+        self._revision += 1
+
+    def sort(self):
+        current = self._current_index()
+        order = sorted(range(len(self)), key=self.__getitem__)
+        self._rebuild(order)
+        self._keep_current(None if current is None else order.index(current))
+
+    def _rebuild(self, order: Sequence[int]):
+        buffer = bytearray()
+        offsets = array.array("Q", [0])
+        for index in order:
+            start = self._offsets[index]
+            end = self._offsets[index + 1]
+            buffer += self._buffer[start:end]
+            offsets.append(len(buffer))
+        self._buffer = buffer
+        self._offsets = offsets
+        self._revision += 1
+
+    # playback order
+
+    def shuffle_seed(self) -> Optional[int]:
+        return self._shuffle_seed
+
+    def set_shuffle(self, seed: Optional[int]):
+        current = self._current_index()
+        self._shuffle_seed = seed
+        if seed is None:
+            self._keys = []
+        else:
+            rng = random.Random(seed)
+            self._keys = [rng.getrandbits(32) for _ in range(_ROUNDS)]
+        self._keep_current(current)
+
+    def position(self) -> int:
+        return self._position
+
+    def index_at(self, position: int) -> int:
+        """Storage index of the entry played at the given position."""
+        count = len(self)
+        position %= count
+        if self._shuffle_seed is None:
+            return position
+        return self._permute(position, count, inverse=False)
+
+    def position_of(self, index: int) -> int:
+        """Playback position of the entry stored at the given index."""
+        if self._shuffle_seed is None:
+            return index
+        return self._permute(index, len(self), inverse=True)
+
+    def entry(self, position: int) -> Path:
+        return self[self.index_at(position)]
+
+    def current(self) -> Optional[Path]:
+        if not len(self):
+            return None
+        return self.entry(self._position)
+
+    def peek(self, offset: int) -> Path:
+        return self.entry(self._position + offset)
+
+    def seek(self, position: int) -> Path:
+        self._position = position % len(self)
+        return self.entry(self._position)
+
+    def next(self) -> Path:
+        return self.seek(self._position + 1)
+
+    def previous(self) -> Path:
+        return self.seek(self._position - 1)
+
+    def _current_index(self) -> Optional[int]:
+        if not len(self):
+            return None
+        return self.index_at(self._position)
+
+    def _keep_current(self, index: Optional[int]):
+        # the current entry keeps playing when the order changes underneath
+        self._position = 0 if index is None else self.position_of(index)
+
+    def _permute(self, value: int, count: int, inverse: bool) -> int:
+        # Feistel network over the smallest even bit width covering count;
+        # values outside the range are walked along their cycle until they
+        # land inside, which keeps this a permutation of range(count)
+        half = max(1, ((count - 1).bit_length() + 1) // 2)
+        mask = (1 << half) - 1
+        while True:
+            left = value >> half
+            right = value & mask
+            if inverse:
+                for key in reversed(self._keys):
+                    left, right = right ^ (_mix(left, key) & mask), left
+            else:
+                for key in self._keys:
+                    left, right = right, left ^ (_mix(right, key) & mask)
+            value = (left << half) | right
+            if value < count:
+                return value
@@ -0,0 +1,167 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from PyQt5 import QtCore, QtGui
+
+from . import metrics
+from .diskcache import DiskImageCache
+from .memory import MemoryGovernor, governor
+
+
+def read_image(
+    filename: Path, target_size: Optional[QtCore.QSize] = None
+) -> QtGui.QImage:
+    reader = QtGui.QImageReader(str(filename))
+    if target_size is not None and not target_size.isEmpty():
+        source_size = reader.size()
+        if source_size.isValid() and (
+            source_size.width() > target_size.width()
+            or source_size.height() > target_size.height()
+        ):
+            # Lets codecs with a scaled decode path (e.g. JPEG) skip most of
+            # the full resolution work
+            reader.setScaledSize(
+                source_size.scaled(
+                    target_size, QtCore.Qt.AspectRatioMode.KeepAspectRatio
+                )
+            )
+    with metrics.timed("decode_ms"):
+        return reader.read()
+
+
+class _DecodeSignals(QtCore.QObject):
+    decoded = QtCore.pyqtSignal(int, str, QtGui.QImage)
+
+
+def _decode(
+    prefetcher: "ImagePrefetcher",
+    signals: _DecodeSignals,
+    generation: int,
+    filename: str,
+    target_size: Optional[QtCore.QSize],
+    disk_cache: Optional[DiskImageCache],
+):
+    # Jobs of a cancelled generation are skipped without decoding
+    if prefetcher._generation != generation:
+        return
+    if (
+        disk_cache is not None
+        and target_size is not None
+        and not target_size.isEmpty()
+        and disk_cache.contains(Path(filename), target_size)
+    ):
+        # a scaled copy on disk loads faster than this decodes, a null image
+        # leaves the slide to it
+        image = QtGui.QImage()
+    else:
+        image = read_image(Path(filename), target_size)
+    try:
+        signals.decoded.emit(generation, filename, image)
+    except RuntimeError:
+        # the prefetcher was destroyed while this job was decoding
+        pass
+
+
+class ImagePrefetcher(QtCore.QObject):
+    """Decodes upcoming slides into QImages on a worker pool.
+
+    QPixmaps may only be created on the GUI thread, so workers produce QImages
+    which are handed back through a queued signal and converted on demand.
+    The pool consists of Python threads: a QThreadPool would wait for running
+    jobs in its destructor while holding the GIL the jobs need. Decoded
+    images count against the memory governor until they are taken.
+    """
+
+    def __init__(
+        self,
+        parent: Optional[QtCore.QObject] = None,
+        lookahead: int = 2,
+        memory: Optional[MemoryGovernor] = None,
+    ):
+        super().__init__(parent)
+        self._lookahead = max(0, lookahead)
+        self._memory = memory if memory is not None else governor()
+        self._target_size: Optional[QtCore.QSize] = None
+        self._disk_cache: Optional[DiskImageCache] = None
+        self._generation = 0
+        self._pending: Set[str] = set()
+        self._ready: Dict[str, QtGui.QImage] = {}
+        self._jobs: List[Future] = []
+        # leave one core for the GUI thread
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, QtCore.QThread.idealThreadCount() - 1),
+            thread_name_prefix="countdown-decode",
+        )
+        self._signals = _DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+
+    def lookahead(self) -> int:
+        return self._lookahead
+
+    def set_lookahead(self, depth: int):
+        self._lookahead = max(0, depth)
+
+    def set_disk_cache(self, disk_cache: Optional[DiskImageCache]):
+        self._disk_cache = disk_cache
+
+    def set_target_size(self, size: QtCore.QSize):
+        if self._target_size is None or self._target_size != size:
+            self._target_size = QtCore.QSize(size)
+            # images decoded for the old size are useless now
+            self.cancel()
+
+    def request(self, filenames: Iterable[Path]):
+        wanted = [str(f) for f in filenames][: self._lookahead]
+        # forget decoded images that fell out of the lookahead window
+        for filename in list(self._ready):
+            if filename not in wanted:
+                del self._ready[filename]
+                self._memory.untrack(self, filename)
+        for filename in wanted:
+            if filename in self._ready or filename in self._pending:
+                continue
+            self._pending.add(filename)
+            target_size = None
+            if self._target_size is not None:
+                target_size = QtCore.QSize(self._target_size)
+            self._jobs = [job for job in self._jobs if not job.done()]
+            self._jobs.append(
+                self._pool.submit(
+                    _decode,
+                    self,
+                    self._signals,
+                    self._generation,
+                    filename,
+                    target_size,
+                    self._disk_cache,
+                )
+            )
+
+    def take(self, filename: Path) -> Optional[QtGui.QImage]:
+        image = self._ready.pop(str(filename), None)
+        self._memory.untrack(self, str(filename))
+        if image is None or image.isNull():
+            return None
+        return image
+
+    def cancel(self):
+        self._generation += 1
+        for job in self._jobs:
+            job.cancel()
+        self._jobs = []
+        self._pending.clear()
+        self._ready.clear()
+        self._memory.untrack_all(self)
+
+    def release_memory(self, filename: str) -> bool:
+        # decoded again on the GUI thread if it is still wanted when due
+        return self._ready.pop(filename, None) is not None
+
+    def _on_decoded(self, generation: int, filename: str, image: QtGui.QImage):
+        if generation != self._generation:
+            return
+        self._pending.discard(filename)
+        self._ready[filename] = image
+        if not image.isNull():
+            self._memory.track(self, filename, image.sizeInBytes(), "prefetched")
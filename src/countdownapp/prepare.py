@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from PyQt5 import QtCore, QtGui
+
+from .scanner import IMG_SUFFIXES, walk_images
+
+CACHE_DIR_NAME = ".countdown-prepared"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_SIZE = (1920, 1080)
+DEFAULT_QUALITY = 90
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PreparedFolder:
+    """Display sized copies of the images of a folder, see CountdownPrepare.py.
+
+    The copies live in a hidden directory inside the folder, which the
+    scanner skips. A manifest records size, mtime and hash of every source
+    file, so a copy is only used as long as its source is unchanged.
+    """
+
+    def __init__(self, folder: Path):
+        self._folder = Path(folder)
+        self._cache_dir = self._folder / CACHE_DIR_NAME
+        self._size: Optional[Tuple[int, int]] = None
+        self._entries: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, folder: Path) -> "PreparedFolder":
+        prepared = cls(folder)
+        try:
+            with open(prepared._cache_dir / MANIFEST_NAME, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return prepared
+        if manifest.get("version") != MANIFEST_VERSION:
+            return prepared
+        prepared._size = tuple(manifest["size"])
+        prepared._entries = manifest["files"]
+        return prepared
+
+    def cache_dir(self) -> Path:
+        return self._cache_dir
+
+    def size(self) -> Optional[Tuple[int, int]]:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entry(self, source: Path) -> Optional[Dict]:
+        return self._entries.get(self._key(source))
+
+    def resolve(self, source: Path, size: Optional[QtCore.QSize] = None) -> Path:
+        """The prepared copy of source if it is up to date and, given a size,
+        not scaled up to fill it, else source."""
+        if not self._entries:
+            return source
+        if size is not None and (
+            size.width() > self._size[0] or size.height() > self._size[1]
+        ):
+            return source
+        entry = self._entries.get(self._key(source))
+        if entry is None:
+            return source
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return source
+        if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+            return source
+        return self._cache_dir / entry["prepared"]
+
+    def save(self, size: Tuple[int, int], entries: Dict[str, Dict]):
+        self._size = tuple(size)
+        self._entries = entries
+        self._cache_dir.mkdir(exist_ok=True)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "size": list(size),
+            "files": entries,
+        }
+        path = self._cache_dir / MANIFEST_NAME
+        temp = path.with_suffix(".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temp, path)
+
+    def _key(self, source: Path) -> str:
+        return Path(os.path.relpath(source, self._folder)).as_posix()
+
+
+def prepare_image(
+    source: str,
+    destination: str,
+    size: Tuple[int, int],
+    quality: int = DEFAULT_QUALITY,
+    known_hash: Optional[str] = None,
+    known_copy: Optional[str] = None,
+) -> Dict:
+    """Writes a copy of source fitting into size with its EXIF orientation
+    applied. Runs in a worker process.
+
+    The copy is destination plus ".jpg", or ".png" for images with an alpha
+    channel. If the content of source still has known_hash and its former
+    copy known_copy exists, nothing is decoded.
+    """
+    stat = os.stat(source)
+    result = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_hash(Path(source)),
+        "prepared": known_copy,
+        "status": "unchanged",
+    }
+    if (
+        known_copy is not None
+        and result["sha1"] == known_hash
+        and os.path.exists(known_copy)
+    ):
+        return result
+
+    reader = QtGui.QImageReader(source)
+    reader.setAutoTransform(True)
+    target = QtCore.QSize(*size)
+    if reader.transformation() & QtGui.QImageIOHandler.TransformationRotate90:
+        # the scaled size applies before the image is turned upright
+        target.transpose()
+    source_size = reader.size()
+    if source_size.isValid() and (
+        source_size.width() > target.width() or source_size.height() > target.height()
+    ):
+        reader.setScaledSize(
+            source_size.scaled(target, QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        )
+    image = reader.read()
+    if image.isNull():
+        result["status"] = "failed"
+        result["error"] = reader.errorString()
+        return result
+
+    if image.hasAlphaChannel():
+        destination += ".png"
+        image_format = b"PNG"
+    else:
+        destination += ".jpg"
+        image_format = b"JPG"
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temp = destination + ".tmp"
+    writer = QtGui.QImageWriter(temp, image_format)
+    writer.setQuality(quality)
+    if not writer.write(image):
+        result["status"] = "failed"
+        result["error"] = writer.errorString()
+        if os.path.exists(temp):
+            os.remove(temp)
+        return result
+    os.replace(temp, destination)
+    result["prepared"] = destination
+    result["status"] = "prepared"
+    return result
+
+
+def prepare_folder(
+    folder: Path,
+    size: Tuple[int, int] = DEFAULT_SIZE,
+    recursive: bool = False,
+    quality: int = DEFAULT_QUALITY,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Brings the prepared copies of folder up to date.
+
+    Files whose size and mtime match the manifest are skipped right away,
+    the others are hashed and only decoded again if their content changed.
+    progress is called with the running totals after every file.
+    """
+    folder = Path(folder)
+    prepared = PreparedFolder.load(folder)
+    cache_dir = prepared.cache_dir()
+    # copies made for another display size are all redone
+    same_size = prepared.size() == tuple(size)
+    old_entries = prepared._entries
+    entries: Dict[str, Dict] = {}
+    stats = {
+        "files": 0,
+        "done": 0,
+        "prepared": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "bytes_read": 0,
+        "seconds": 0.0,
+        "errors": [],
+    }
+    # multiprocessing is only loaded when a folder is prepared, not by the app
+    from concurrent.futures import ProcessPoolExecutor
+
+    started = time.perf_counter()
+    jobs = {}
+    with ProcessPoolExecutor(workers) as pool:
+        for path in walk_images(folder, IMG_SUFFIXES, recursive):
+            stats["files"] += 1
+            key = prepared._key(path)
+            old = old_entries.get(key) if same_size else None
+            known_copy = None
+            if old is not None:
+                known_copy = cache_dir / old["prepared"]
+                stat = os.stat(path)
+                if (
+                    stat.st_size == old["size"]
+                    and stat.st_mtime_ns == old["mtime_ns"]
+                    and known_copy.exists()
+                ):
+                    entries[key] = old
+                    stats["unchanged"] += 1
+                    stats["done"] += 1
+                    continue
+            future = pool.submit(
+                prepare_image,
+                path,
+                str(cache_dir / key),
+                tuple(size),
+                quality,
+                old["sha1"] if old else None,
+                str(known_copy) if known_copy else None,
+            )
+            jobs[future] = key
+
+        for future in as_completed(jobs):
+            key = jobs[future]
+            try:
+                result = future.result()
+            except OSError as e:
+                result = {"status": "failed", "error": str(e)}
+            stats["done"] += 1
+            stats[result["status"]] += 1
+            stats["bytes_read"] += result.get("size", 0)
+            stats["seconds"] = time.perf_counter() - started
+            if result["status"] == "failed":
+                stats["errors"].append((key, result["error"]))
+            else:
+                entries[key] = {
+                    "size": result["size"],
+                    "mtime_ns": result["mtime_ns"],
+                    "sha1": result["sha1"],
+                    "prepared": Path(result["prepared"])
+                    .relative_to(cache_dir)
+                    .as_posix(),
+                }
+            if progress is not None:
+                progress(stats)
+
+    # remove copies of deleted files and ones replaced under another name
+    for key, old in old_entries.items():
+        entry = entries.get(key)
+        if entry is None or entry["prepared"] != old["prepared"]:
+            try:
+                (cache_dir / old["prepared"]).unlink()
+            except OSError:
+                pass
+    prepared.save(size, entries)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
@@ -0,0 +1,188 @@
+import datetime
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, Iterator, Optional, Tuple
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from .clock import SimulatedClock
+from .gallery import Slideshow
+from .layout import CORNER_ALIGNMENTS, timer_rect
+from .timer import CountdownTimer
+
+
+class ImageSequenceWriter:
+    """Writes every frame to its own file, e.g. ``frames/frame_%06d.png``."""
+
+    def __init__(self, pattern: str, quality: int = -1):
+        self._pattern = pattern
+        self._format = Path(pattern).suffix.lstrip(".").upper() or "PNG"
+        self._quality = quality
+        Path(pattern % 0).parent.mkdir(parents=True, exist_ok=True)
+
+    def encode(self, image: QtGui.QImage) -> bytes:
+        data = QtCore.QByteArray()
+        buffer = QtCore.QBuffer(data)
+        buffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, self._format, self._quality)
+        buffer.close()
+        return bytes(data)
+
+    def write(self, index: int, data: bytes):
+        with open(self._pattern % index, "wb") as f:
+            f.write(data)
+
+
+class RawFrameWriter:
+    """Writes the frames as packed rgb24 to a stream, e.g. a pipe to ffmpeg."""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+
+    def encode(self, image: QtGui.QImage) -> bytes:
+        rgb = image.convertToFormat(QtGui.QImage.Format.Format_RGB888)
+        row = 3 * rgb.width()
+        data = rgb.constBits().asstring(rgb.sizeInBytes())
+        if rgb.bytesPerLine() == row:
+            return data
+        # drop the padding at the end of the scan lines
+        stride = rgb.bytesPerLine()
+        lines = []
+        for start in range(0, stride * rgb.height(), stride):
+            end = start + row
+            lines.append(data[start:end])
+        return b"".join(lines)
+
+    def write(self, index: int, data: bytes):
+        self._stream.write(data)
+
+
+class OfflineRenderer:
+    """Plays a countdown show on a simulated clock and renders its frames.
+
+    The regular Slideshow, PixmapView and CountdownTimer widgets are laid out
+    in a host widget that is never shown on screen, and each frame is painted
+    from them the way CompositorView does. Frames that did not change are
+    not painted or encoded again; encoding runs on a pool of worker threads.
+    """
+
+    def __init__(
+        self,
+        size: QtCore.QSize,
+        fps: float,
+        clock: Optional[SimulatedClock] = None,
+    ):
+        self._size = QtCore.QSize(size)
+        self._fps = fps
+        self._clock = clock if clock is not None else SimulatedClock()
+        self._corner = 3
+        self._timer_visible = True
+        self._dirty = True
+
+        self._host = QtWidgets.QWidget()
+        self._host.setAttribute(QtCore.Qt.WidgetAttribute.WA_DontShowOnScreen)
+        self._host.resize(self._size)
+        self._slideshow = Slideshow(self._host, self._clock)
+        self._slideshow.setGeometry(self._host.rect())
+        self._view = self._slideshow._view
+        # frames must not depend on how fast a worker delivers smooth copies
+        self._slideshow.set_adaptive_scaling(False)
+        self._view.set_composited(True)
+        self._view.changed.connect(self._invalidate)
+        self._timer = CountdownTimer(self._host, self._clock)
+        self._timer.hide()
+        self._timer.finished.connect(self._slideshow.stop)
+        self._timer.textDirty.connect(self._invalidate)
+        self._timer.geometryHintChanged.connect(self._place_timer)
+        self._host.show()
+
+    def clock(self) -> SimulatedClock:
+        return self._clock
+
+    def slideshow(self) -> Slideshow:
+        return self._slideshow
+
+    def timer(self) -> CountdownTimer:
+        return self._timer
+
+    def setTimerCorner(self, corner: int):
+        self._corner = corner
+        self._place_timer()
+
+    def setTimerVisible(self, visible: bool):
+        self._timer_visible = visible
+        self._dirty = True
+
+    def _invalidate(self, *args):
+        self._dirty = True
+
+    def _place_timer(self):
+        self._timer.setAlignment(CORNER_ALIGNMENTS[self._corner])
+        self._timer.setGeometry(
+            timer_rect(self._corner, self._timer.sizeHint(), self._host.rect())
+        )
+        self._dirty = True
+
+    def start(self, folder: Path, end_time: datetime.datetime, recursive=False):
+        # the folder is scanned completely before the clock starts moving, so
+        # the output does not depend on how fast the disk is
+        app = QtWidgets.QApplication.instance()
+        done = []
+        self._slideshow._scanner.finished.connect(lambda *_: done.append(True))
+        self._slideshow.start(folder, recursive)
+        while not done:
+            app.processEvents(QtCore.QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+        app.processEvents()
+        self._timer.start(end_time)
+
+    def frames(self, count: int) -> Iterator[Tuple[QtGui.QImage, bool]]:
+        """The next count frames and whether each differs from the one before."""
+        app = QtWidgets.QApplication.instance()
+        start = self._clock.monotonic()
+        image = None
+        for index in range(count):
+            self._clock.advance(start + index / self._fps - self._clock.monotonic())
+            app.processEvents()
+            changed = image is None or self._dirty
+            if changed:
+                image = self._paint()
+                self._dirty = False
+            yield image, changed
+
+    def _paint(self) -> QtGui.QImage:
+        image = QtGui.QImage(self._size, QtGui.QImage.Format.Format_RGB32)
+        painter = QtGui.QPainter(image)
+        self._view.paint_into(painter, self._view.mapTo(self._host, QtCore.QPoint()))
+        if self._timer_visible:
+            self._timer.paint_into(painter, self._timer.pos())
+        painter.end()
+        return image
+
+    def render(self, count: int, writer, workers: Optional[int] = None) -> Dict:
+        workers = workers or QtCore.QThread.idealThreadCount()
+        started = time.perf_counter()
+        encoded = 0
+        pending: Deque[Tuple[int, Future]] = deque()
+        with ThreadPoolExecutor(workers, thread_name_prefix="countdown-render") as pool:
+            future = None
+            for index, (image, changed) in enumerate(self.frames(count)):
+                if changed:
+                    future = pool.submit(writer.encode, image)
+                    encoded += 1
+                pending.append((index, future))
+                # frames are written in order, bounding the ones in flight
+                while len(pending) > 4 * workers:
+                    written, done = pending.popleft()
+                    writer.write(written, done.result())
+            while pending:
+                written, done = pending.popleft()
+                writer.write(written, done.result())
+        elapsed = time.perf_counter() - started
+        return {
+            "frames": count,
+            "encoded": encoded,
+            "seconds": elapsed,
+            "realtime_factor": count / self._fps / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Hashable, Iterable, Optional, Tuple
+
+from PyQt5 import QtCore, QtGui
+
+from . import metrics
+from .prefetch import read_image
+
+# while sizes keep changing a fast copy is shown, the smooth one is made once
+# they stayed for this long
+IDLE_MS = 150
+
+# (key, source, original or None, file to read it from, target size)
+RescaleJob = Tuple[str, Hashable, Optional[QtGui.QImage], Optional[str], QtCore.QSize]
+
+
+class _RescaleSignals(QtCore.QObject):
+    scaled = QtCore.pyqtSignal(int, str, object, QtCore.QSize, QtGui.QImage)
+
+
+class BackgroundRescaler(QtCore.QObject):
+    """Scales images smoothly on a worker thread.
+
+    Only the latest request counts: jobs of an older one, or of one followed
+    by cancel(), are skipped before they start and their results are dropped.
+    Originals which are no longer held are read from their file, shrunk while
+    decoding where the codec allows it.
+    """
+
+    # key, source and target size of the job, and the scaled image
+    scaled = QtCore.pyqtSignal(str, object, QtCore.QSize, QtGui.QImage)
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self._generation = 0
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="countdown-rescale")
+        self._signals = _RescaleSignals()
+        self._signals.scaled.connect(self._on_scaled)
+
+    def request(self, jobs: Iterable[RescaleJob]):
+        self._generation += 1
+        for key, source, image, filename, size in jobs:
+            self._pool.submit(
+                self._run,
+                self._generation,
+                key,
+                source,
+                image,
+                filename,
+                QtCore.QSize(size),
+            )
+
+    def cancel(self):
+        self._generation += 1
+
+    def _run(
+        self,
+        generation: int,
+        key: str,
+        source: Hashable,
+        image: Optional[QtGui.QImage],
+        filename: Optional[str],
+        size: QtCore.QSize,
+    ):
+        if generation != self._generation:
+            metrics.count("rescales_cancelled")
+            return
+        if image is None:
+            image = read_image(Path(filename), size)
+        if image.isNull():
+            return
+        if image.size() != image.size().scaled(
+            size, QtCore.Qt.AspectRatioMode.KeepAspectRatio
+        ):
+            with metrics.timed("rescale_ms"):
+                image = image.scaled(
+                    size,
+                    QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+                    QtCore.Qt.TransformationMode.SmoothTransformation,
+                )
+        try:
+            self._signals.scaled.emit(generation, key, source, size, image)
+        except RuntimeError:
+            # the rescaler was destroyed while this job was running
+            pass
+
+    def _on_scaled(
+        self,
+        generation: int,
+        key: str,
+        source: Hashable,
+        size: QtCore.QSize,
+        image: QtGui.QImage,
+    ):
+        if generation == self._generation:
+            self.scaled.emit(key, source, size, image)
@@ -0,0 +1,106 @@
+import os
+import time
+from pathlib import Path
+from threading import Thread
+from typing import Collection, List, Optional
+
+from PyQt5 import QtCore
+
+IMG_SUFFIXES = {".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".png"}
+FLUSH_INTERVAL_S = 0.25
+
+
+def walk_images(
+    folder: Path,
+    suffixes: Collection[str],
+    recursive: bool = False,
+    directories: Optional[List[str]] = None,
+):
+    """Paths of the files in folder with one of the suffixes, unsorted.
+
+    The folders walked through are appended to directories, if given.
+    """
+    pending = [str(folder)]
+    while pending:
+        directory = pending.pop()
+        if directories is not None:
+            directories.append(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            # skip hidden folders like our own caches
+                            if recursive and not entry.name.startswith("."):
+                                pending.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in suffixes:
+                            yield entry.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class FolderScanner(QtCore.QObject):
+    """Lists image files of a folder on a background thread.
+
+    Found files are reported in batches through ``batchFound`` as soon as they
+    turn up, the first one immediately. ``finished`` delivers the complete,
+    sorted list and the folders that were walked. Every scan has a generation
+    number; starting a new scan or calling cancel() makes the results of
+    older scans stale.
+    """
+
+    batchFound = QtCore.pyqtSignal(int, list)
+    finished = QtCore.pyqtSignal(int, list, list)
+
+    def __init__(
+        self,
+        suffixes: Collection[str],
+        parent: QtCore.QObject = None,
+        batch_size: int = 256,
+    ):
+        super().__init__(parent)
+        self._suffixes = suffixes
+        self._batch_size = batch_size
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def scan(self, folder: Path, recursive: bool = False) -> int:
+        self._generation += 1
+        t = Thread(
+            target=self._run, args=(self._generation, folder, recursive), daemon=True
+        )
+        t.start()
+        return self._generation
+
+    def cancel(self):
+        self._generation += 1
+
+    def _run(self, generation: int, folder: Path, recursive: bool):
+        found: List[str] = []
+        batch: List[str] = []
+        directories: List[str] = []
+        last_flush = 0.0
+        for filename in walk_images(folder, self._suffixes, recursive, directories):
+            if generation != self._generation:
+                return
+            found.append(filename)
+            batch.append(filename)
+            now = time.monotonic()
+            if (
+                len(found) == 1
+                or len(batch) >= self._batch_size
+                or now - last_flush >= FLUSH_INTERVAL_S
+            ):
+                self.batchFound.emit(generation, batch)
+                batch = []
+                last_flush = now
+        if generation != self._generation:
+            return
+        if batch:
+            self.batchFound.emit(generation, batch)
+        found.sort(key=Path)
+        self.finished.emit(generation, found, directories)
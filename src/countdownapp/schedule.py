@@ -0,0 +1,226 @@
+import datetime
+import heapq
+import itertools
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from PyQt5 import QtCore
+
+from . import metrics
+from .clock import SystemClock
+
+# assets of a segment are prepared this long before it starts
+PREPARE_LEAD_S = 60.0
+
+
+class Segment:
+    """One countdown of a program, e.g. doors open, main part or break.
+
+    A segment ends at a time of day (the next one after it starts) or after
+    a duration; the next segment starts when it ends. Folder and music stay
+    for following segments which have none, the video is played at the end
+    of its own segment only. auto_quit, if given, is what happens when the
+    program ends with this segment.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        end: Optional[datetime.time] = None,
+        duration_s: Optional[float] = None,
+        folder: Optional[Path] = None,
+        recursive: bool = False,
+        music: Optional[Path] = None,
+        video: Optional[Path] = None,
+        auto_quit: Optional[bool] = None,
+    ):
+        if (end is None) == (duration_s is None):
+            raise ValueError(f"segment {name!r} needs either an end or a duration")
+        self.name = name
+        self.end = end
+        self.duration_s = duration_s
+        self.folder = folder
+        self.recursive = recursive
+        self.music = music
+        self.video = video
+        self.auto_quit = auto_quit
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Segment":
+        def path(key: str) -> Optional[Path]:
+            return Path(data[key]) if data.get(key) else None
+
+        end = data.get("end")
+        return cls(
+            name=data.get("name", ""),
+            end=datetime.time.fromisoformat(end) if end else None,
+            duration_s=data.get("duration"),
+            folder=path("folder"),
+            recursive=bool(data.get("recursive", False)),
+            music=path("music"),
+            video=path("video"),
+            auto_quit=data.get("auto_quit"),
+        )
+
+    def end_after(self, start: datetime.datetime) -> datetime.datetime:
+        if self.duration_s is not None:
+            return start + datetime.timedelta(seconds=self.duration_s)
+        end = datetime.datetime.combine(start.date(), self.end)
+        if end <= start:
+            end += datetime.timedelta(days=1)
+        return end
+
+
+def load_schedule(path: Path) -> List[Segment]:
+    """Reads segments from a JSON file: {"segments": [{...}, ...]}.
+
+    Each segment has "end" ("HH:MM[:SS]") or "duration" (seconds) and
+    optionally "name", "folder", "recursive", "music", "video" and
+    "auto_quit". Raises ValueError for anything else.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("segments"), list):
+        raise ValueError(f"{path}: expected an object with a list of segments")
+    segments = [Segment.from_dict(s) for s in data["segments"]]
+    if not segments:
+        raise ValueError(f"{path}: no segments")
+    return segments
+
+
+class TimerWheel(QtCore.QObject):
+    """Calls functions at times of a clock, all on one timer.
+
+    The pending calls are kept in a heap and the timer is always armed for
+    the earliest one, so any number of them costs one timer in the event
+    loop. Calls that are due together run in the order they were added.
+    """
+
+    def __init__(
+        self,
+        parent: Optional[QtCore.QObject] = None,
+        clock: Optional[SystemClock] = None,
+    ):
+        super().__init__(parent)
+        self._clock = clock if clock is not None else SystemClock()
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._cancelled: Set[int] = set()
+        self._counter = itertools.count()
+        self._timer = self._clock.create_timer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._fire)
+
+    def __len__(self) -> int:
+        return len(self._heap) - len(self._cancelled)
+
+    def call_at(self, due: float, callback: Callable[[], None]) -> int:
+        """Calls callback at the monotonic time due; returns a handle."""
+        handle = next(self._counter)
+        heapq.heappush(self._heap, (due, handle, callback))
+        self._arm()
+        return handle
+
+    def cancel(self, handle: int):
+        if any(entry[1] == handle for entry in self._heap):
+            self._cancelled.add(handle)
+
+    def clear(self):
+        self._heap = []
+        self._cancelled.clear()
+        self._timer.stop()
+
+    def _arm(self):
+        while self._heap and self._heap[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(self._heap)[1])
+        if not self._heap:
+            self._timer.stop()
+            return
+        delay = self._heap[0][0] - self._clock.monotonic()
+        self._timer.start(max(0, round(1000 * delay)))
+
+    def _fire(self):
+        now = self._clock.monotonic()
+        while self._heap and self._heap[0][0] <= now:
+            due, handle, callback = heapq.heappop(self._heap)
+            if handle in self._cancelled:
+                self._cancelled.discard(handle)
+                continue
+            metrics.record("schedule_lateness_ms", 1000 * (now - due))
+            callback()
+        self._arm()
+
+
+class ScheduleEngine(QtCore.QObject):
+    """Runs segments one after the other on a TimerWheel.
+
+    segmentPrepare(index) is emitted PREPARE_LEAD_S before a segment
+    starts, or right away if it starts sooner, so its assets can be loaded
+    in the background. segmentStarted(index, end_time) switches to it and
+    finished is emitted when the last one ends.
+    """
+
+    segmentPrepare = QtCore.pyqtSignal(int)
+    segmentStarted = QtCore.pyqtSignal(int, object)
+    finished = QtCore.pyqtSignal()
+
+    def __init__(
+        self,
+        segments: List[Segment],
+        parent: Optional[QtCore.QObject] = None,
+        clock: Optional[SystemClock] = None,
+        prepare_lead_s: float = PREPARE_LEAD_S,
+    ):
+        super().__init__(parent)
+        self._segments = list(segments)
+        self._clock = clock if clock is not None else SystemClock()
+        self._prepare_lead_s = prepare_lead_s
+        self._wheel = TimerWheel(self, self._clock)
+        self._current: Optional[int] = None
+        self._running = False
+
+    def segments(self) -> List[Segment]:
+        return list(self._segments)
+
+    def current(self) -> Optional[int]:
+        return self._current
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """Starts the first segment now and plans all others after it."""
+        self.stop()
+        self._running = True
+        now = self._clock.now()
+        monotonic = self._clock.monotonic()
+        start = now
+        for index, segment in enumerate(self._segments):
+            end = segment.end_after(start)
+            due = monotonic + (start - now).total_seconds()
+            self._wheel.call_at(
+                max(monotonic, due - self._prepare_lead_s),
+                lambda index=index: self.segmentPrepare.emit(index),
+            )
+            self._wheel.call_at(
+                due, lambda index=index, end=end: self._start_segment(index, end)
+            )
+            start = end
+        self._wheel.call_at(
+            monotonic + (start - now).total_seconds(), self._on_finished
+        )
+
+    def stop(self):
+        self._wheel.clear()
+        self._running = False
+        self._current = None
+
+    def _start_segment(self, index: int, end: datetime.datetime):
+        self._current = index
+        metrics.event("schedule.segment", self._segments[index].name or index)
+        self.segmentStarted.emit(index, end)
+
+    def _on_finished(self):
+        self._running = False
+        self.finished.emit()
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from PyQt5 import QtCore
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SESSION_VERSION = 1
+AUTOSAVE_INTERVAL_MS = 5000
+
+
+def default_path() -> Path:
+    location = QtCore.QStandardPaths.writableLocation(
+        QtCore.QStandardPaths.StandardLocation.GenericDataLocation
+    )
+    if not location:
+        location = str(Path.home() / ".local" / "share")
+    return Path(location) / "countdown" / "session.json"
+
+
+def playlist_path(path: Path) -> Path:
+    # the playlist is only written when it changes, next to the session
+    path = Path(path)
+    return path.with_name(path.stem + ".playlist.json")
+
+
+def _read(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if isinstance(state, dict) else None
+
+
+def load(path: Path) -> Optional[Dict]:
+    """The saved session, with the playlist it refers to as "playlist" or
+    None if that file is missing or from another save."""
+    state = _read(path)
+    if state is None or state.get("version") != SESSION_VERSION:
+        return None
+    revision = state.pop("playlist_revision", None)
+    state["playlist"] = None
+    if revision is not None:
+        saved = _read(playlist_path(path))
+        if saved is not None and saved.get("revision") == revision:
+            state["playlist"] = saved.get("playlist")
+    return state
+
+
+def write(path: Path, text: str):
+    # a crash while writing leaves the former snapshot in place
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(".tmp")
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+class SessionAutosaver(QtCore.QObject):
+    """Writes snapshots of the session to a file while the show runs.
+
+    snapshot() is called on the GUI thread every interval; the file is only
+    written, on a worker thread, when the snapshot differs from the last one.
+    The playlist, which may hold tens of thousands of names, goes into a file
+    of its own: playlist() is only called when playlist_key() changed, None
+    meaning there is none to save. It returns a function which the worker
+    calls for the data, so the names are listed off the GUI thread.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict],
+        path: Path,
+        interval_ms: int = AUTOSAVE_INTERVAL_MS,
+        parent: Optional[QtCore.QObject] = None,
+        playlist_key: Optional[Callable[[], Optional[Hashable]]] = None,
+        playlist: Optional[Callable[[], Callable[[], Any]]] = None,
+    ):
+        super().__init__(parent)
+        self._snapshot = snapshot
+        self._path = Path(path)
+        self._last_text: Optional[str] = None
+        self._playlist_key = playlist_key
+        self._playlist = playlist
+        self._saved_key: Optional[Hashable] = None
+        # unique per process, an older session never matches a newer playlist
+        self._token = uuid.uuid4().hex[:8]
+        self._playlist_saves = 0
+        self.saves = 0
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="countdown-session")
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.save)
+
+    def path(self) -> Path:
+        return self._path
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        # the last state is on disk before the app goes away
+        if self._stopped:
+            return
+        self._timer.stop()
+        self.save()
+        self._stopped = True
+        self._pool.shutdown(wait=True)
+
+    def save(self):
+        if self._stopped:
+            return
+        with metrics.timed("session_snapshot_ms"):
+            revision = self._save_playlist()
+            state = dict(
+                self._snapshot(), version=SESSION_VERSION, playlist_revision=revision
+            )
+            text = json.dumps(state, separators=(",", ":"))
+        if text == self._last_text:
+            return
+        self._last_text = text
+        # one worker: the playlist is on disk before a session refers to it
+        self._pool.submit(self._write, self._path, text)
+
+    def _save_playlist(self) -> Optional[str]:
+        if self._playlist_key is None:
+            return None
+        key = self._playlist_key()
+        if key is None:
+            self._saved_key = None
+            return None
+        if key != self._saved_key:
+            self._saved_key = key
+            self._playlist_saves += 1
+            self._pool.submit(self._write_playlist, self._revision(), self._playlist())
+        return self._revision()
+
+    def _revision(self) -> str:
+        return f"{self._token}-{self._playlist_saves}"
+
+    def _write_playlist(self, revision: str, playlist: Callable[[], Any]):
+        text = json.dumps(
+            {"revision": revision, "playlist": playlist()}, separators=(",", ":")
+        )
+        self._write(playlist_path(self._path), text)
+
+    def _write(self, path: Path, text: str):
+        try:
+            write(path, text)
+            self.saves += 1
+        except OSError as e:
+            logger.warning("cannot save the session to %s: %s", path, e)
@@ -0,0 +1,358 @@
+import datetime
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from PyQt5 import QtCore, QtNetwork
+
+from . import metrics
+from .clock import SystemClock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP = "239.255.42.99"
+DEFAULT_PORT = 45454
+PROTOCOL_VERSION = 1
+BEACON_INTERVAL_MS = 250
+# followers ask for a delay measurement this often
+REQUEST_INTERVAL_MS = 1000
+# delay replies carried by one beacon, the rest wait for the next one
+MAX_REPLIES = 48
+# the sample with the lowest round trip of these gives the offset
+OFFSET_SAMPLES = 8
+# a follower without beacons for this long runs on its own again
+LEADER_TIMEOUT_S = 3.0
+
+
+class SyncedClock(SystemClock):
+    """The leader's time on a follower.
+
+    monotonic() is the local monotonic clock moved by the offset the
+    SyncFollower estimated, so it counts in the leader's timebase. now() is
+    the leader's wall time. Until the first estimate both are local.
+    """
+
+    def __init__(self, local: Optional[SystemClock] = None):
+        self._local = local if local is not None else SystemClock()
+        self._offset = 0.0
+        # wall time minus monotonic time, the leader's once synced
+        self._epoch = time.time() - self._local.monotonic()
+
+    def local(self) -> SystemClock:
+        return self._local
+
+    def offset(self) -> float:
+        return self._offset
+
+    def set_offset(self, offset: float, epoch: Optional[float] = None):
+        self._offset = offset
+        if epoch is not None:
+            self._epoch = epoch
+
+    def monotonic(self) -> float:
+        return self._local.monotonic() + self._offset
+
+    def wall_time(self, monotonic: float) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self._epoch + monotonic)
+
+    def now(self) -> datetime.datetime:
+        return self.wall_time(self.monotonic())
+
+
+def _encode(message: Dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def _decode(data: bytes) -> Optional[Dict]:
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or message.get("v") != PROTOCOL_VERSION:
+        return None
+    return message
+
+
+def _multicast_socket(parent: QtCore.QObject, group: str, port: int):
+    socket = QtNetwork.QUdpSocket(parent)
+    # several instances on one machine all receive the group
+    socket.bind(
+        QtNetwork.QHostAddress.AnyIPv4,
+        port,
+        QtNetwork.QUdpSocket.ShareAddress | QtNetwork.QUdpSocket.ReuseAddressHint,
+    )
+    if not socket.joinMulticastGroup(QtNetwork.QHostAddress(group)):
+        logger.warning("cannot join %s: %s", group, socket.errorString())
+    return socket
+
+
+class SyncLeader(QtCore.QObject):
+    """Multicasts the countdown and slideshow state of this instance.
+
+    Every beacon carries the leader's monotonic send time, the countdown
+    deadline and the slide position with the time of the next change, all in
+    the leader's monotonic timebase. Followers send small delay requests;
+    their receive times are answered in bulk in the next beacon, so the
+    leader never sends anything per follower.
+    """
+
+    def __init__(
+        self,
+        timer,
+        slideshow,
+        group: str = DEFAULT_GROUP,
+        port: int = DEFAULT_PORT,
+        parent: Optional[QtCore.QObject] = None,
+        clock: Optional[SystemClock] = None,
+    ):
+        super().__init__(parent)
+        self._timer = timer
+        self._slideshow = slideshow
+        self._clock = clock if clock is not None else SystemClock()
+        self._group = QtNetwork.QHostAddress(group)
+        self._port = port
+        self._seq = 0
+        # follower id -> (its send time, our receive time)
+        self._requests: Dict[str, Tuple[float, float]] = {}
+        self.beacons = 0
+        self.requests = 0
+        # beacons go out from an own port, which is where requests come back
+        self._socket = QtNetwork.QUdpSocket(self)
+        self._socket.bind(QtNetwork.QHostAddress.AnyIPv4, 0)
+        self._socket.setSocketOption(
+            QtNetwork.QAbstractSocket.SocketOption.MulticastLoopbackOption, 1
+        )
+        self._socket.readyRead.connect(self._on_ready_read)
+        self._beacon_timer = QtCore.QTimer(self)
+        self._beacon_timer.setInterval(BEACON_INTERVAL_MS)
+        self._beacon_timer.timeout.connect(self.send_beacon)
+        self._beacon_timer.start()
+        # a slide change is announced right away
+        slideshow.slideShown.connect(lambda _: self.send_beacon())
+        metrics.register_gauge("sync", self.stats)
+
+    def stop(self):
+        self._beacon_timer.stop()
+        self._socket.close()
+
+    def stats(self) -> Dict[str, float]:
+        return {"role": "leader", "beacons": self.beacons, "requests": self.requests}
+
+    def _on_ready_read(self):
+        while self._socket.hasPendingDatagrams():
+            data, _, _ = self._socket.readDatagram(self._socket.pendingDatagramSize())
+            received = self._clock.monotonic()
+            message = _decode(data)
+            if message is None or message.get("type") != "delay_req":
+                continue
+            self.requests += 1
+            self._requests[str(message["id"])] = (float(message["t1"]), received)
+
+    def _state(self) -> Dict:
+        now = self._clock.monotonic()
+        next_change = None
+        remaining_ms = self._slideshow.next_change_ms()
+        if remaining_ms is not None:
+            next_change = now + remaining_ms / 1000
+        playlist = self._slideshow.playlist()
+        return {
+            "epoch": time.time() - now,
+            "deadline": self._timer.deadline(),
+            "pos": self._slideshow.position(),
+            "count": len(playlist),
+            "next": next_change,
+            "seed": playlist.shuffle_seed(),
+        }
+
+    def send_beacon(self):
+        message = self._state()
+        replies = []
+        for follower_id in list(self._requests)[:MAX_REPLIES]:
+            t1, t2 = self._requests.pop(follower_id)
+            replies.append([follower_id, t1, t2])
+        self._seq += 1
+        message.update(v=PROTOCOL_VERSION, type="beacon", seq=self._seq)
+        message["replies"] = replies
+        # the send time goes in last, as close to the send as possible
+        message["t3"] = self._clock.monotonic()
+        self._socket.writeDatagram(_encode(message), self._group, self._port)
+        self.beacons += 1
+
+
+class SyncFollower(QtCore.QObject):
+    """Follows a SyncLeader on the same multicast group.
+
+    The offset to the leader's clock is estimated like NTP: a request sent
+    at t1 (follower) reaches the leader at t2, the beacon answering it leaves
+    at t3 (leader) and arrives at t4, so the offset is
+    ((t2 - t1) + (t3 - t4)) / 2 and the round trip (t4 - t1) - (t3 - t2).
+    Of the last few samples the one with the shortest round trip wins. The
+    estimate moves the SyncedClock; countdown and slide changes scheduled on
+    it then happen together with the leader's.
+    """
+
+    # the countdown deadline moved, as wall time of the synced clock
+    endTimeChanged = QtCore.pyqtSignal(object)
+    # show this playlist position now
+    slideDue = QtCore.pyqtSignal(int)
+    shuffleChanged = QtCore.pyqtSignal(object)
+    leaderLost = QtCore.pyqtSignal()
+
+    def __init__(
+        self,
+        clock: SyncedClock,
+        group: str = DEFAULT_GROUP,
+        port: int = DEFAULT_PORT,
+        parent: Optional[QtCore.QObject] = None,
+    ):
+        super().__init__(parent)
+        self._clock = clock
+        self._id = f"{QtNetwork.QHostInfo.localHostName()}-{os.getpid()}-{id(self)}"
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=OFFSET_SAMPLES)
+        self._leader: Optional[Tuple[QtNetwork.QHostAddress, int]] = None
+        self._last_beacon = 0.0
+        self._last_seq = 0
+        self._deadline: Optional[float] = None
+        self._position: Optional[int] = None
+        # leader time the shown position took effect
+        self._changed_at = float("-inf")
+        self._seed: Optional[int] = None
+        self._scheduled: Optional[Tuple[float, int]] = None
+        self.beacons = 0
+        self.delay = 0.0
+        self._socket = _multicast_socket(self, group, port)
+        self._socket.readyRead.connect(self._on_ready_read)
+        self._request_timer = QtCore.QTimer(self)
+        self._request_timer.setInterval(REQUEST_INTERVAL_MS)
+        self._request_timer.timeout.connect(self._send_request)
+        self._request_timer.start()
+        self._slide_timer = QtCore.QTimer(self)
+        self._slide_timer.setSingleShot(True)
+        self._slide_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._slide_timer.timeout.connect(self._on_slide_timer)
+        metrics.register_gauge("sync", self.stats)
+
+    def stop(self):
+        self._request_timer.stop()
+        self._slide_timer.stop()
+        self._socket.close()
+
+    def is_synced(self) -> bool:
+        return bool(self._samples) and (
+            self._clock.local().monotonic() - self._last_beacon < LEADER_TIMEOUT_S
+        )
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "role": "follower",
+            "synced": self.is_synced(),
+            "offset_ms": 1000 * self._clock.offset(),
+            "delay_ms": 1000 * self.delay,
+            "beacons": self.beacons,
+        }
+
+    def _send_request(self):
+        if self._leader is None:
+            return
+        if self._clock.local().monotonic() - self._last_beacon > LEADER_TIMEOUT_S:
+            self._leader = None
+            self.leaderLost.emit()
+            return
+        message = {
+            "v": PROTOCOL_VERSION,
+            "type": "delay_req",
+            "id": self._id,
+            "t1": self._clock.local().monotonic(),
+        }
+        address, port = self._leader
+        self._socket.writeDatagram(_encode(message), address, port)
+
+    def _on_ready_read(self):
+        while self._socket.hasPendingDatagrams():
+            data, address, port = self._socket.readDatagram(
+                self._socket.pendingDatagramSize()
+            )
+            received = self._clock.local().monotonic()
+            message = _decode(data)
+            if message is None or message.get("type") != "beacon":
+                continue
+            self._on_beacon(message, address, port, received)
+
+    def _on_beacon(
+        self, message: Dict, address: QtNetwork.QHostAddress, port: int, t4: float
+    ):
+        first = self._leader is None
+        if first or (address, port) != self._leader:
+            # a new or restarted leader starts a new sequence
+            self._leader = (address, port)
+            self._last_seq = 0
+            self._changed_at = float("-inf")
+            self._samples.clear()
+        if message["seq"] <= self._last_seq:
+            return
+        self._last_seq = message["seq"]
+        self._last_beacon = t4
+        self.beacons += 1
+        t3 = message["t3"]
+        for follower_id, t1, t2 in message["replies"]:
+            if follower_id == self._id:
+                self._add_sample(t1, t2, t3, t4, message["epoch"])
+        if first:
+            # a rough offset until the first round trip is measured
+            self._clock.set_offset(t3 - t4, message["epoch"])
+            self._send_request()
+        self._apply(message)
+
+    def _add_sample(self, t1: float, t2: float, t3: float, t4: float, epoch: float):
+        delay = (t4 - t1) - (t3 - t2)
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        self._samples.append((delay, offset))
+        self.delay, best = min(self._samples)
+        self._clock.set_offset(best, epoch)
+        metrics.record("sync_offset_ms", 1000 * best)
+        metrics.record("sync_delay_ms", 1000 * self.delay)
+
+    def _apply(self, message: Dict):
+        deadline = message["deadline"]
+        if deadline is not None and deadline != self._deadline:
+            self._deadline = deadline
+            self.endTimeChanged.emit(self._clock.wall_time(deadline))
+        if message["seed"] != self._seed:
+            self._seed = message["seed"]
+            self.shuffleChanged.emit(self._seed)
+        position = message["pos"]
+        # a beacon sent before our own scheduled change is outdated
+        if position is None or message["t3"] < self._changed_at:
+            return
+        if position != self._position:
+            # joined late, missed a change or the leader skipped
+            self._show(position, message["t3"])
+        next_change = message["next"]
+        if next_change is None:
+            self._scheduled = None
+            self._slide_timer.stop()
+        else:
+            self._schedule(next_change, (position + 1) % max(1, message["count"]))
+
+    def _schedule(self, due: float, position: int):
+        if self._scheduled == (due, position):
+            return
+        self._scheduled = (due, position)
+        delay = due - self._clock.monotonic()
+        self._slide_timer.start(max(0, round(1000 * delay)))
+
+    def _on_slide_timer(self):
+        if self._scheduled is None:
+            return
+        due, position = self._scheduled
+        self._scheduled = None
+        if position != self._position:
+            self._show(position, due)
+
+    def _show(self, position: int, changed_at: float):
+        self._position = position
+        self._changed_at = changed_at
+        self.slideDue.emit(position)
@@ -1,21 +1,60 @@
 import datetime
-import time
-from threading import Thread
-from typing import Optional
+import math
+from collections import deque
+from typing import Deque, Dict, Optional
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from . import metrics
+from .clock import SystemClock
+from .glyphs import DIGITS, GlyphAtlas, atlas_for
+
+JITTER_HISTORY = 300
+# Qt timers may fire a little early, ticks within this are taken as on time
+EARLY_TOLERANCE_S = 0.002
+
+
+def format_remaining(diff_seconds: int) -> str:
+    sec = diff_seconds % 60
+    min = int(diff_seconds / 60)
+    if min >= 60:
+        hour = int(min / 60)
+        min = min % 60
+        return f"{hour:02d}:{min:02d}:{sec:02d}"
+    return f"{min:02d}:{sec:02d}"
+
 
 class CountdownTimer(QtWidgets.QLabel):
     finished = QtCore.pyqtSignal()
+    # whole seconds left, emitted whenever the display changes
+    ticked = QtCore.pyqtSignal(int)
+    # the size needed for the digits changed, see sizeHint()
+    geometryHintChanged = QtCore.pyqtSignal()
+    # region of changed glyphs in parent coordinates, for external painters
+    textDirty = QtCore.pyqtSignal(QtGui.QRegion)
 
-    def __init__(self, parent: QtWidgets.QWidget):
+    def __init__(self, parent: QtWidgets.QWidget, clock: Optional[SystemClock] = None):
         super().__init__(parent)
+        self._clock = clock if clock is not None else SystemClock()
         self._end_time: Optional[datetime.datetime] = None
         self._active = False
         self._color: Optional[QtGui.QColor] = None
         self._padding_x = 0
         self._padding_y = 0
+        self._text = ""
+        self._atlas: Optional[GlyphAtlas] = None
+        # end of the countdown on the monotonic clock
+        self._deadline = 0.0
+        self._shown: Optional[int] = None
+        self._next_due: Optional[float] = None
+        self._jitter: Deque[float] = deque(maxlen=JITTER_HISTORY)
+        self._paint_count = 0
+        self._painted_area = 0
+        self._last_painted_area = 0
+        self._tick_timer = self._clock.create_timer(self)
+        self._tick_timer.setSingleShot(True)
+        self._tick_timer.setTimerType(QtCore.Qt.TimerType.PreciseTimer)
+        self._tick_timer.timeout.connect(self._tick)
         self._init_ui()
 
     def _init_ui(self):
@@ -27,53 +66,184 @@ class CountdownTimer(QtWidgets.QLabel):
 
     def setFontColor(self, color: QtGui.QColor):
         self._color = color
-        self._updateStyleSheet()
-
-    def _updateStyleSheet(self):
-        stylesheet = f"color: {self._color.name()}; margin: {self._padding_y}px {self._padding_x}px; qproperty-indent:0;"
-        self.setStyleSheet(stylesheet)
+        self._atlas = None
+        self.update()
 
     def setPaddingX(self, padding):
         self._padding_x = padding
-        self._updateStyleSheet()
+        self.update()
+        self.geometryHintChanged.emit()
 
     def setPaddingY(self, padding):
         self._padding_y = padding
-        self._updateStyleSheet()
+        self.update()
+        self.geometryHintChanged.emit()
+
+    def text(self) -> str:
+        return self._text
+
+    def setText(self, text: str):
+        # The label text is not used, digits are blitted from a glyph atlas in
+        # paintEvent and only the characters that changed get repainted
+        if text == self._text:
+            return
+        old_text = self._text
+        self._text = text
+        if self._box_size(old_text) != self._box_size(text):
+            # the owner moves and resizes us, which repaints everything anyway
+            self.update()
+            self.geometryHintChanged.emit()
+            return
+        atlas = self._glyphs()
+        old_rects = atlas.layout(old_text, self._text_rect(old_text).topLeft())
+        new_rects = atlas.layout(text, self._text_rect(text).topLeft())
+        dirty = QtGui.QRegion()
+        for i in range(max(len(old_rects), len(new_rects))):
+            if (
+                i >= len(old_rects)
+                or i >= len(new_rects)
+                or old_text[i] != text[i]
+                or old_rects[i] != new_rects[i]
+            ):
+                if i < len(old_rects):
+                    dirty += old_rects[i]
+                if i < len(new_rects):
+                    dirty += new_rects[i]
+        if not dirty.isEmpty():
+            if self.isVisible():
+                self.update(dirty)
+            self.textDirty.emit(dirty.translated(self.pos()))
+
+    def _glyphs(self) -> GlyphAtlas:
+        if self._atlas is None:
+            self._atlas = atlas_for(self.font(), self._color, self.devicePixelRatioF())
+        return self._atlas
+
+    def _box_size(self, text: str) -> QtCore.QSize:
+        if not text:
+            return QtCore.QSize(0, 0)
+        # Sized for the widest digits, so the box stays put while counting
+        atlas = self._glyphs()
+        widest = max(DIGITS, key=atlas.advance)
+        template = "".join(widest if ch in DIGITS else ch for ch in text)
+        size = atlas.size(template)
+        return QtCore.QSize(
+            size.width() + 2 * (self._padding_x + atlas.padding()),
+            size.height() + 2 * self._padding_y,
+        )
+
+    def sizeHint(self) -> QtCore.QSize:
+        return self._box_size(self._text)
+
+    def repaint_stats(self) -> Dict[str, int]:
+        window = self.window().size()
+        return {
+            "paints": self._paint_count,
+            "last_area": self._last_painted_area,
+            "total_area": self._painted_area,
+            "widget_area": self.width() * self.height(),
+            "window_area": window.width() * window.height(),
+        }
+
+    def _text_rect(self, text: str) -> QtCore.QRect:
+        margin_x = self._padding_x + self._glyphs().padding()
+        contents = self.contentsRect().adjusted(
+            margin_x, self._padding_y, -margin_x, -self._padding_y
+        )
+        return QtWidgets.QStyle.alignedRect(
+            self.layoutDirection(),
+            self.alignment(),
+            self._glyphs().size(text),
+            contents,
+        )
+
+    def changeEvent(self, event):
+        if event.type() == QtCore.QEvent.Type.FontChange:
+            self._atlas = None
+            self.update()
+            self.geometryHintChanged.emit()
+        super().changeEvent(event)
+
+    def paintEvent(self, event):
+        area = sum(r.width() * r.height() for r in event.region().rects())
+        self._paint_count += 1
+        self._painted_area += area
+        self._last_painted_area = area
+        if not self._text:
+            return
+        painter = QtGui.QPainter(self)
+        self._glyphs().draw(
+            painter, self._text_rect(self._text).topLeft(), self._text, event.rect()
+        )
+
+    def paint_into(self, painter: QtGui.QPainter, offset: QtCore.QPoint):
+        # offset is the position of this widget in the painter's coordinates
+        if not self._text:
+            return
+        origin = self._text_rect(self._text).topLeft() + offset
+        self._glyphs().draw(painter, origin, self._text)
 
     def start(self, end_time: datetime.datetime):
+        # Restarting reuses the running tick timer, only the deadline moves
         self._end_time = end_time
         self._active = True
-        t = Thread(target=self._run)
-        t.start()
+        remaining = (end_time - self._clock.now()).total_seconds()
+        self._deadline = self._clock.monotonic() + remaining
+        self._shown = None
+        self._next_due = None
+        self._tick()
 
     def stop(self):
-        self._active = False
+        self.cancel()
         self.setText("")
         self.finished.emit()
 
-    def _run(self):
-        while self._active:
-            if not self._end_time:
-                time.sleep(1)
-            else:
-                diff_seconds = 1
-                while self._active and diff_seconds >= 0:
-                    current_time = datetime.datetime.now()
-                    diff_seconds = int((self._end_time - current_time).total_seconds())
-                    if diff_seconds >= 0:
-                        sec = diff_seconds % 60
-                        min = int(diff_seconds / 60)
-                        if min >= 60:
-                            hour = int(min / 60)
-                            min = min % 60
-                            self.setText(f"{hour:02d}:{min:02d}:{sec:02d}")
-                        else:
-                            self.setText(f"{min:02d}:{sec:02d}")
-                        time.sleep(1)
-                    else:
-                        self.stop()
+    def cancel(self):
+        self._active = False
+        self._tick_timer.stop()
+
+    def deadline(self) -> Optional[float]:
+        # the end of the countdown on the monotonic time of the clock
+        return self._deadline if self._active else None
+
+    def jitter_stats(self) -> Dict[str, float]:
+        # lateness of the ticks against their second boundaries, in ms
+        if not self._jitter:
+            return {"count": 0, "mean_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+        return {
+            "count": len(self._jitter),
+            "mean_ms": 1000 * sum(self._jitter) / len(self._jitter),
+            "max_ms": 1000 * max(self._jitter),
+            "last_ms": 1000 * self._jitter[-1],
+        }
+
+    def _tick(self):
+        if not self._active:
+            return
+        now = self._clock.monotonic()
+        if self._next_due is not None:
+            if now < self._next_due - EARLY_TOLERANCE_S:
+                self._schedule(self._next_due - now)
+                return
+            self._jitter.append(now - self._next_due)
+            metrics.record("tick_lateness_ms", 1000 * (now - self._next_due))
+        diff_seconds = math.floor(self._deadline - now)
+        if self._shown is not None:
+            # a tick right on the boundary must never show the old value again
+            diff_seconds = min(diff_seconds, self._shown - 1)
+        if diff_seconds < 0:
+            self.stop()
+            return
+        self._shown = diff_seconds
+        self.setText(format_remaining(diff_seconds))
+        # the display changes when the remaining time crosses the next second
+        self._next_due = self._deadline - diff_seconds
+        self._schedule(self._next_due - now)
+        self.ticked.emit(diff_seconds)
+
+    def _schedule(self, delay: float):
+        self._tick_timer.start(max(0, math.ceil(delay * 1000)))
 
     def closeEvent(self, event):
-        self._active = False
+        self.cancel()
         event.accept()
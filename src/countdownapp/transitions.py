@@ -0,0 +1,200 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from PyQt5 import QtCore, QtGui
+
+from . import metrics
+
+CUT = "cut"
+CROSSFADE = "crossfade"
+KEN_BURNS = "kenburns"
+TRANSITIONS = (CUT, CROSSFADE, KEN_BURNS)
+DEFAULT_DURATION_MS = 800
+DEFAULT_FPS = 25
+# the incoming slide of a Ken Burns transition settles from this zoom
+KEN_BURNS_ZOOM = 1.15
+# frames are blended at half, then a quarter of the resolution when the full
+# one does not fit into the frame budget; below that the transition is cut
+MIN_SCALE = 0.25
+
+
+def _on_canvas(image: QtGui.QImage, size: QtCore.QSize) -> QtGui.QImage:
+    # both slides centered on a transparent canvas of the slide area
+    canvas = QtGui.QImage(size, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+    canvas.fill(QtCore.Qt.GlobalColor.transparent)
+    painter = QtGui.QPainter(canvas)
+    painter.drawImage(
+        (size.width() - image.width()) // 2,
+        (size.height() - image.height()) // 2,
+        image,
+    )
+    painter.end()
+    return canvas
+
+
+def render_frame(
+    kind: str,
+    old: QtGui.QImage,
+    new: QtGui.QImage,
+    progress: float,
+    scale: float = 1.0,
+) -> QtGui.QImage:
+    """One frame of a transition between two canvases of the same size.
+
+    The frame is (1 - progress) * old + progress * new, so the background
+    shows through wherever neither slide covers the canvas. With a scale
+    below 1 the frame has fewer pixels and is drawn stretched.
+    """
+    width = max(1, round(old.width() * scale))
+    height = max(1, round(old.height() * scale))
+    frame = QtGui.QImage(width, height, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+    frame.fill(QtCore.Qt.GlobalColor.transparent)
+    frame.setDevicePixelRatio(scale)
+    painter = QtGui.QPainter(frame)
+    painter.setOpacity(1 - progress)
+    painter.drawImage(0, 0, old)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode.CompositionMode_Plus)
+    painter.setOpacity(progress)
+    if kind == KEN_BURNS:
+        # ease out, the slide slows down as it comes to rest
+        rest = (1 - progress) ** 2
+        zoom = 1 + (KEN_BURNS_ZOOM - 1) * rest
+        painter.translate(old.width() * (0.5 + 0.05 * rest), old.height() * 0.5)
+        painter.scale(zoom, zoom)
+        painter.translate(-old.width() * 0.5, -old.height() * 0.5)
+    painter.drawImage(0, 0, new)
+    painter.end()
+    return frame
+
+
+class _TransitionSignals(QtCore.QObject):
+    frameReady = QtCore.pyqtSignal(int, QtGui.QImage)
+    finished = QtCore.pyqtSignal(int, dict)
+
+
+class TransitionEngine(QtCore.QObject):
+    """Renders transition frames on a worker thread while they are shown.
+
+    Each frame is blended for the time it is rendered at, so a slow machine
+    simply gets fewer frames. A frame over the budget of 1/fps halves the
+    resolution of the following ones; over budget at the lowest resolution
+    the transition ends in a cut. While the GUI thread has not picked up a
+    frame, newer ones are dropped instead of queued. ``finished`` reports the
+    frames shown and the achieved fps.
+    """
+
+    frameReady = QtCore.pyqtSignal(QtGui.QImage)
+    finished = QtCore.pyqtSignal(dict)
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None, fps: int = DEFAULT_FPS):
+        super().__init__(parent)
+        self._fps = fps
+        self._generation = 0
+        self._in_flight = False
+        self._pool = ThreadPoolExecutor(1, thread_name_prefix="countdown-transition")
+        self._signals = _TransitionSignals()
+        self._signals.frameReady.connect(self._on_frame_ready)
+        self._signals.finished.connect(self._on_finished)
+        self._last_stats: Dict[str, float] = {}
+
+    def fps(self) -> int:
+        return self._fps
+
+    def set_fps(self, fps: int):
+        self._fps = max(1, fps)
+
+    def last_stats(self) -> Dict[str, float]:
+        return dict(self._last_stats)
+
+    def start(
+        self,
+        kind: str,
+        old: QtGui.QImage,
+        new: QtGui.QImage,
+        size: QtCore.QSize,
+        duration_ms: int = DEFAULT_DURATION_MS,
+    ):
+        self._generation += 1
+        self._in_flight = False
+        self._pool.submit(
+            self._run,
+            self._generation,
+            kind,
+            old,
+            new,
+            QtCore.QSize(size),
+            duration_ms / 1000,
+            1 / self._fps,
+        )
+
+    def cancel(self):
+        self._generation += 1
+
+    def _run(
+        self,
+        generation: int,
+        kind: str,
+        old: QtGui.QImage,
+        new: QtGui.QImage,
+        size: QtCore.QSize,
+        duration: float,
+        budget: float,
+    ):
+        old = _on_canvas(old, size)
+        new = _on_canvas(new, size)
+        started = time.monotonic()
+        scale = 1.0
+        shown = 0
+        dropped = 0
+        cut = False
+        while generation == self._generation:
+            frame_started = time.monotonic()
+            progress = (frame_started - started) / duration
+            if progress >= 1:
+                break
+            frame = render_frame(kind, old, new, progress, scale)
+            took = time.monotonic() - frame_started
+            if took > budget:
+                if scale <= MIN_SCALE:
+                    cut = True
+                    break
+                scale /= 2
+            if self._in_flight:
+                dropped += 1
+            else:
+                self._in_flight = True
+                self._emit(self._signals.frameReady, generation, frame)
+                shown += 1
+            time.sleep(max(0.0, budget - took))
+        elapsed = max(time.monotonic() - started, 1e-6)
+        stats = {
+            "kind": kind,
+            "frames": shown,
+            "dropped": dropped,
+            "fps": shown / elapsed,
+            "scale": scale,
+            "cut": cut,
+        }
+        self._emit(self._signals.finished, generation, stats)
+
+    def _emit(self, signal, *args):
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            # the engine was destroyed while a transition was running
+            pass
+
+    def _on_frame_ready(self, generation: int, frame: QtGui.QImage):
+        self._in_flight = False
+        if generation == self._generation:
+            self.frameReady.emit(frame)
+
+    def _on_finished(self, generation: int, stats: dict):
+        if generation != self._generation:
+            return
+        self._last_stats = stats
+        metrics.record("transition_fps", stats["fps"])
+        if stats["cut"]:
+            metrics.count("transition_cuts")
+        self.finished.emit(stats)
@@ -0,0 +1,284 @@
+import os
+import time
+from pathlib import Path
+from threading import Thread
+from typing import Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from PyQt5 import QtCore
+
+from .scanner import walk_images
+
+DEBOUNCE_MS = 500
+# a folder that keeps changing is still looked at this often
+MAX_DELAY_S = 2.0
+
+
+class _Listing:
+    def __init__(
+        self, files: Optional[Set[str]] = None, folders: Optional[Set[str]] = None
+    ):
+        self.files: Set[str] = files if files is not None else set()
+        self.folders: Set[str] = folders if folders is not None else set()
+
+
+class _Changes:
+    """What a worker found when listing folders again."""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.removed: List[str] = []
+        # folders that are gone, with all their subfolders
+        self.gone: List[str] = []
+        # new listings of the folders that were looked at
+        self.listings: Dict[str, _Listing] = {}
+        # listings of new subfolders
+        self.new_listings: Dict[str, _Listing] = {}
+        # size and mtime of files which are not reported yet
+        self.unsettled: Dict[str, Tuple[int, int]] = {}
+
+
+def _settled(
+    path: str,
+    unsettled: Dict[str, Tuple[int, int]],
+    seen: Dict[str, Tuple[int, int]],
+) -> bool:
+    # a new file counts once its size and mtime stayed the same from one
+    # listing to the next, a file still being copied is left out until then
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    state = (stat.st_size, stat.st_mtime_ns)
+    if unsettled.get(path) == state:
+        return True
+    seen[path] = state
+    return False
+
+
+class FolderWatcher(QtCore.QObject):
+    """Reports images added to or removed from scanned folders.
+
+    Change notifications are collected for a short while and then only the
+    folders they came from are listed again on a background thread and
+    compared to what was known before, so a burst of copies costs one listing
+    per folder. New files are only reported once their size and mtime stayed
+    the same over two listings. A renamed file shows up as removed under its
+    old and added under its new name.
+    """
+
+    filesAdded = QtCore.pyqtSignal(list)
+    filesRemoved = QtCore.pyqtSignal(list)
+    _listed = QtCore.pyqtSignal(int, object)
+
+    def __init__(self, suffixes: Collection[str], parent: QtCore.QObject = None):
+        super().__init__(parent)
+        self._suffixes = suffixes
+        self._recursive = False
+        self._listings: Dict[str, _Listing] = {}
+        self._pending: Set[str] = set()
+        self._first_pending = 0.0
+        self._unsettled: Dict[str, Tuple[int, int]] = {}
+        # one listing runs at a time, results of an older watch() are dropped
+        self._generation = 0
+        self._busy = False
+        self._listed.connect(self._on_listed)
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(DEBOUNCE_MS)
+        self._debounce.timeout.connect(self._flush)
+
+    def watch(
+        self,
+        folder: Path,
+        recursive: bool,
+        files: Iterable[str],
+        directories: Iterable[str],
+    ):
+        """Starts watching with the result of a scan of folder."""
+        self.stop()
+        self._recursive = recursive
+        for directory in directories:
+            self._listings[directory] = _Listing()
+        self._listings.setdefault(str(folder), _Listing())
+        for filename in files:
+            parent, name = os.path.split(filename)
+            listing = self._listings.get(parent)
+            if listing is not None:
+                listing.files.add(name)
+        for directory in self._listings:
+            parent, name = os.path.split(directory)
+            listing = self._listings.get(parent)
+            if listing is not None and directory != parent:
+                listing.folders.add(name)
+        self._watcher.addPaths(list(self._listings))
+
+    def directories(self) -> List[str]:
+        return list(self._listings)
+
+    def recheck(self):
+        """Lists all folders once more, e.g. when the listing given to watch()
+        was saved earlier and the folder may have changed in between."""
+        for directory in self._listings:
+            self._on_directory_changed(directory)
+
+    def stop(self):
+        self._generation += 1
+        self._busy = False
+        self._debounce.stop()
+        self._pending.clear()
+        self._unsettled.clear()
+        watched = self._watcher.directories()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._listings.clear()
+
+    def _on_directory_changed(self, directory: str):
+        if not self._pending:
+            self._first_pending = time.monotonic()
+        self._pending.add(directory)
+        # restarting pushes the flush behind the last event of a burst, but
+        # not further than MAX_DELAY_S after its first one
+        if (
+            time.monotonic() - self._first_pending < MAX_DELAY_S
+            or not self._debounce.isActive()
+        ):
+            self._debounce.start()
+
+    def _flush(self):
+        if self._busy:
+            # listed once the running pass is done
+            return
+        pending = self._pending
+        self._pending = set()
+        # listings are replaced when they change, never changed in place, so
+        # the worker can read them
+        known = {d: self._listings[d] for d in pending if d in self._listings}
+        if not known:
+            return
+        self._busy = True
+        t = Thread(
+            target=self._run,
+            args=(self._generation, known, dict(self._unsettled)),
+            daemon=True,
+        )
+        t.start()
+
+    def _run(
+        self,
+        generation: int,
+        known: Dict[str, _Listing],
+        unsettled: Dict[str, Tuple[int, int]],
+    ):
+        result = _Changes()
+        # files of other folders are checked when those are listed
+        result.unsettled = {
+            path: state
+            for path, state in unsettled.items()
+            if os.path.dirname(path) not in known
+        }
+        for directory, listing in known.items():
+            self._update(directory, listing, unsettled, result)
+        try:
+            self._listed.emit(generation, result)
+        except RuntimeError:
+            # the watcher was destroyed while this was listing
+            pass
+
+    def _update(
+        self,
+        directory: str,
+        listing: _Listing,
+        unsettled: Dict[str, Tuple[int, int]],
+        result: "_Changes",
+    ):
+        files: Set[str] = set()
+        folders: Set[str] = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if self._recursive and not entry.name.startswith("."):
+                                folders.add(entry.name)
+                        elif os.path.splitext(entry.name)[1].lower() in self._suffixes:
+                            files.add(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            # the folder itself was deleted or renamed
+            if not os.path.isdir(directory):
+                result.gone.append(directory)
+            return
+        result.removed.extend(os.path.join(directory, n) for n in listing.files - files)
+        known = listing.files & files
+        for name in files - listing.files:
+            path = os.path.join(directory, name)
+            if _settled(path, unsettled, result.unsettled):
+                known.add(name)
+                result.added.append(path)
+        result.listings[directory] = _Listing(known, folders)
+        result.gone.extend(
+            os.path.join(directory, n) for n in listing.folders - folders
+        )
+        for name in folders - listing.folders:
+            self._add_tree(os.path.join(directory, name), unsettled, result)
+
+    def _add_tree(
+        self,
+        folder: str,
+        unsettled: Dict[str, Tuple[int, int]],
+        result: "_Changes",
+    ):
+        directories: List[str] = []
+        found = list(walk_images(Path(folder), self._suffixes, True, directories))
+        listings = {directory: _Listing() for directory in directories}
+        for directory in directories:
+            parent, name = os.path.split(directory)
+            if directory != folder and parent in listings:
+                listings[parent].folders.add(name)
+        for filename in found:
+            if _settled(filename, unsettled, result.unsettled):
+                parent, name = os.path.split(filename)
+                listings[parent].files.add(name)
+                result.added.append(filename)
+        result.new_listings.update(listings)
+
+    def _on_listed(self, generation: int, result: "_Changes"):
+        if generation != self._generation:
+            return
+        self._busy = False
+        removed = result.removed
+        for directory, listing in result.listings.items():
+            if directory in self._listings:
+                self._listings[directory] = listing
+        for folder in result.gone:
+            self._forget(folder, removed)
+        for directory, listing in result.new_listings.items():
+            if directory not in self._listings:
+                self._listings[directory] = listing
+                self._watcher.addPath(directory)
+        self._unsettled = {
+            path: state
+            for path, state in result.unsettled.items()
+            if os.path.dirname(path) in self._listings
+        }
+        if removed:
+            self.filesRemoved.emit(removed)
+        if result.added:
+            self.filesAdded.emit(result.added)
+        # files still being written are looked at again after the next delay
+        for directory in {os.path.dirname(path) for path in self._unsettled}:
+            self._on_directory_changed(directory)
+        if self._pending and not self._debounce.isActive():
+            self._debounce.start()
+
+    def _forget(self, folder: str, removed: List[str]):
+        prefix = folder + os.sep
+        for directory in [
+            d for d in self._listings if d == folder or d.startswith(prefix)
+        ]:
+            listing = self._listings.pop(directory)
+            removed.extend(os.path.join(directory, n) for n in listing.files)
+            self._watcher.removePath(directory)